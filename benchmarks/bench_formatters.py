@@ -0,0 +1,119 @@
+"""Microbenchmark for the prompt formatters.
+
+Times `deduplicate_and_format_sources`, `format_sections` and `format_completed_items`
+on 10 to 500 synthetic items of about 20KB each and reports the time per item. The
+formatters should scale linearly, so the time per item should stay roughly flat as
+the batch grows; with --check the script exits with an error when it grows by more
+than --max-ratio between the smallest and the largest batch. Cache effects alone
+account for a few times; quadratic string building shows up as a ratio close to the
+ratio of the batch sizes (50x for the defaults).
+
+Usage (from the repository root):
+    python benchmarks/bench_formatters.py [--sizes 10 50 100 500] [--check]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Only the formatters are timed; no search is made and the search cache stays closed
+os.environ.setdefault("SEARCH_CACHE_ENABLED", "false")
+
+from src.open_deep_research.newsletter_state import BlockType, ResearchBlock, Status
+from src.open_deep_research.state import Section
+from src.open_deep_research.utils import (
+    deduplicate_and_format_sources,
+    format_completed_items,
+    format_sections,
+)
+
+CONTENT_BYTES = 20_000
+
+def _text(seed: int, size: int = CONTENT_BYTES) -> str:
+    sentence = f"Sentence {seed} about topic {seed % 17} with some filler words to pad it out. "
+    return (sentence * (size // len(sentence) + 1))[:size]
+
+def make_search_responses(count: int, per_query: int = 5):
+    return [
+        {
+            "query": f"query {start}",
+            "results": [
+                {
+                    "title": f"Source {i}",
+                    "url": f"https://example.com/{i}",
+                    "content": _text(i, 300),
+                    "score": 1 - i / count,
+                    "raw_content": _text(i)
+                }
+                for i in range(start, min(start + per_query, count))
+            ]
+        }
+        for start in range(0, count, per_query)
+    ]
+
+def make_sections(count: int):
+    return [
+        Section(name=f"Section {i}", description=_text(i, 200), research=True, content=_text(i))
+        for i in range(count)
+    ]
+
+def make_completed_items(count: int):
+    return [
+        ResearchBlock(
+            id=f"block-{i}",
+            block_type=BlockType.RESEARCH,
+            description=_text(i, 200),
+            status=Status.COMPLETED,
+            output=_text(i),
+            research_goal=_text(i, 200),
+            desired_output="Summary",
+            relevant_context=_text(i, 500)
+        )
+        for i in range(count)
+    ]
+
+BENCHMARKS = {
+    "deduplicate_and_format_sources": (
+        make_search_responses,
+        lambda data: deduplicate_and_format_sources(data, max_tokens_per_source=5000, include_raw_content=True)
+    ),
+    "format_sections": (make_sections, format_sections),
+    "format_completed_items": (make_completed_items, format_completed_items),
+}
+
+def run(sizes, repeat):
+    """Return {benchmark: {size: seconds per item}}, best of `repeat` runs."""
+    results = {}
+    for name, (make, formatter) in BENCHMARKS.items():
+        results[name] = {}
+        for size in sizes:
+            data = make(size)
+            best = min(timeit.repeat(lambda: formatter(data), number=1, repeat=repeat))
+            results[name][size] = best / size
+            print(f"{name:32} {size:5d} items  {best * 1000:9.2f} ms  {best / size * 1e6:9.1f} us/item")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="fail when the time per item grows superlinearly")
+    parser.add_argument("--max-ratio", type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = run(sorted(args.sizes), args.repeat)
+    if not args.check:
+        return 0
+
+    failed = False
+    for name, per_item in results.items():
+        smallest, largest = per_item[min(per_item)], per_item[max(per_item)]
+        ratio = largest / smallest
+        if ratio > args.max_ratio:
+            print(f"REGRESSION: {name} time per item grew {ratio:.1f}x from {min(per_item)} to {max(per_item)} items")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
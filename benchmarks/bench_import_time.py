@@ -0,0 +1,89 @@
+"""Import-time benchmark for the graph modules.
+
+Imports each module in a fresh interpreter with `python -X importtime` and reports the
+cumulative import time of the module and the slowest modules it pulls in, best of
+--repeat runs. The API keys are removed from the environment first: the graphs create
+their provider clients on first use (see clients.py), so importing them must work
+without keys. With --check the script exits with an error when an import fails or
+takes longer than --max-ms.
+
+Usage (from the repository root):
+    python benchmarks/bench_import_time.py [--modules src.open_deep_research.graph ...] [--check]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["src.open_deep_research.graph", "src.open_deep_research.newsletter_graph"]
+API_KEYS = ["TAVILY_API_KEY", "PERPLEXITY_API_KEY", "ANTHROPIC_API_KEY", "OPENAI_API_KEY", "GROQ_API_KEY"]
+
+def import_times(module):
+    """Import `module` in a fresh interpreter.
+
+    Returns:
+        {imported module: (cumulative microseconds, nesting depth)}, depth 0 being `module`
+        and depth 1 the modules it imports directly.
+    """
+    env = {key: value for key, value in os.environ.items() if key not in API_KEYS}
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr.strip().splitlines()[-1]}")
+
+    times = {}
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level after the separator's space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = (int(cumulative), depth)
+    return times
+
+def run(modules, repeat, top):
+    """Return {module: best cumulative milliseconds}, printing the slowest direct imports."""
+    results = {}
+    for module in modules:
+        runs = [import_times(module) for _ in range(repeat)]
+        best = min(runs, key=lambda times: times[module][0])
+        results[module] = best[module][0] / 1000
+        print(f"{module:50} {results[module]:9.1f} ms")
+        direct_imports = sorted(
+            ((name, cumulative) for name, (cumulative, depth) in best.items() if depth == 1),
+            key=lambda item: item[1], reverse=True
+        )
+        for name, cumulative in direct_imports[:top]:
+            print(f"    {name:46} {cumulative / 1000:9.1f} ms")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="number of direct imports to list")
+    parser.add_argument("--check", action="store_true", help="fail when an import fails or is slower than --max-ms")
+    parser.add_argument("--max-ms", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    try:
+        results = run(args.modules, args.repeat, args.top)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    if not args.check:
+        return 0
+
+    failed = False
+    for module, elapsed in results.items():
+        if elapsed > args.max_ms:
+            print(f"REGRESSION: importing {module} took {elapsed:.0f} ms (limit {args.max_ms:.0f} ms)")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional
+
+from src.open_deep_research.cache import CACHE_DIR
+from src.open_deep_research.logger import MetricCounters
+
+BLOB_STORE_PATH = os.environ.get("BLOB_STORE_PATH", str(CACHE_DIR / "blobs.sqlite"))
+BLOB_MIN_BYTES = int(os.environ.get("BLOB_MIN_BYTES", 4096)) # Smaller texts stay inline, a reference would not save much
+BLOB_REF_PREFIX = "blob:sha256:"
+
+@dataclass
+class BlobStoreStats(MetricCounters):
+    """Counters for the blob store."""
+    puts: int = 0 # Texts stored (including ones already present)
+    gets: int = 0 # References resolved
+    bytes_in: int = 0 # Uncompressed bytes of the stored texts
+    bytes_stored: int = 0 # Compressed bytes written for new blobs
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REF_PREFIX)
+
+class BlobStore:
+    """Content-addressed store for large texts, backed by SQLite.
+
+    Texts are keyed by the SHA-256 of their UTF-8 bytes and stored compressed, so
+    storing the same text twice costs nothing and a reference always resolves to the
+    exact text it was created from. References are plain strings ("blob:sha256:<hex>"),
+    which lets them sit in any `str` field of the graph state. Blobs are never evicted
+    while a run may still hold references to them; use `prune` to remove old ones.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stats = BlobStoreStats()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "digest TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def put(self, text: str) -> str:
+        """Store a text and return its reference."""
+        raw = text.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        data = zlib.compress(raw)
+        with self._lock:
+            inserted = self._connect().execute(
+                "INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?)", (digest, data, len(raw), time.time())
+            ).rowcount
+        self.stats.puts += 1
+        self.stats.bytes_in += len(raw)
+        if inserted:
+            self.stats.bytes_stored += len(data)
+        return BLOB_REF_PREFIX + digest
+
+    def get(self, ref: str) -> str:
+        """Return the text behind a reference; raises KeyError for unknown references."""
+        digest = ref[len(BLOB_REF_PREFIX):]
+        with self._lock:
+            row = self._connect().execute("SELECT data FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"Blob not found: {ref}")
+        self.stats.gets += 1
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def prune(self, older_than: float) -> int:
+        """Delete blobs stored more than `older_than` seconds ago; returns how many were removed."""
+        with self._lock:
+            return self._connect().execute(
+                "DELETE FROM blobs WHERE created_at < ?", (time.time() - older_than,)
+            ).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_blob_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    """Return the process-wide blob store."""
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore(BLOB_STORE_PATH)
+    return _blob_store
+
+def store_text(text: str, enabled: bool = True) -> str:
+    """Return a blob reference for a large text, or the text itself.
+
+    Texts are kept inline when blob storage is disabled or when they are shorter than
+    BLOB_MIN_BYTES. Either way the result can be passed to `resolve_text`.
+    """
+    if not enabled or not isinstance(text, str) or len(text) < BLOB_MIN_BYTES or is_blob_ref(text):
+        return text
+    return get_blob_store().put(text)
+
+def resolve_text(value: Any) -> Any:
+    """Return the text behind a blob reference; any other value is returned unchanged."""
+    if is_blob_ref(value):
+        return get_blob_store().get(value)
+    return value
+
+def resolve_messages(messages: List[Any]) -> List[Any]:
+    """Return the messages with blob references in their content replaced by the text."""
+    return [
+        message.model_copy(update={"content": resolve_text(message.content)})
+        if is_blob_ref(getattr(message, "content", None)) else message
+        for message in messages
+    ]
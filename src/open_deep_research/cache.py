@@ -0,0 +1,245 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.open_deep_research.logger import MetricCounters, NewsletterLogger
+
+# Defaults can be overridden through the environment, like the rest of the configuration
+CACHE_DIR = Path(os.environ.get("OPEN_DEEP_RESEARCH_CACHE_DIR", Path.home() / ".cache" / "open_deep_research"))
+SEARCH_CACHE_PATH = os.environ.get("SEARCH_CACHE_PATH", str(CACHE_DIR / "search_cache.sqlite"))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 12 * 60 * 60)) # Seconds a search result stays fresh
+SEARCH_CACHE_MAX_BYTES = int(os.environ.get("SEARCH_CACHE_MAX_BYTES", 512 * 1024 * 1024)) # Size bound before LRU eviction
+SEARCH_CACHE_ENABLED = os.environ.get("SEARCH_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+TOOL_CACHE_PATH = os.environ.get("TOOL_CACHE_PATH", str(CACHE_DIR / "tool_cache.sqlite"))
+TOOL_CACHE_TTL = float(os.environ.get("TOOL_CACHE_TTL", 24 * 60 * 60)) # Seconds a research tool result stays fresh
+TOOL_CACHE_MAX_BYTES = int(os.environ.get("TOOL_CACHE_MAX_BYTES", 256 * 1024 * 1024)) # Size bound before LRU eviction
+TOOL_CACHE_ENABLED = os.environ.get("TOOL_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+@dataclass
+class CacheStats(MetricCounters):
+    """Counters for a cache instance, reported through the logger."""
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = super().as_dict()
+        lookups = self.hits + self.misses
+        stats["hit_rate"] = round(self.hits / lookups, 3) if lookups else 0.0
+        return stats
+
+class DiskCache:
+    """A persistent key/value cache backed by SQLite.
+
+    Values are stored as JSON together with an expiry time (per-entry TTL) and a last
+    access time. When the total stored size grows past `max_bytes`, the least recently
+    used entries are evicted. The connection is opened lazily and guarded by a lock so
+    the cache can be used from worker threads.
+    """
+
+    def __init__(self, path: str, default_ttl: float, max_bytes: int):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return the fresh cached values for `keys`, skipping misses and expired entries."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            placeholders = ",".join("?" * len(keys))
+            rows = conn.execute(
+                f"SELECT key, value, size, expires_at FROM entries WHERE key IN ({placeholders})", keys
+            ).fetchall()
+            expired = []
+            for key, value, size, expires_at in rows:
+                if expires_at < now:
+                    expired.append(key)
+                    continue
+                found[key] = json.loads(value)
+                self.stats.bytes_read += size
+            if expired:
+                conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in expired])
+                self.stats.expired += len(expired)
+            if found:
+                conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+        self.stats.hits += len(found)
+        self.stats.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Store `items`, each expiring after `ttl` seconds (the cache default if None)."""
+        if not items:
+            return
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        rows = []
+        for key, value in items.items():
+            payload = json.dumps(value).encode("utf-8")
+            rows.append((key, payload, len(payload), expires_at, now))
+            self.stats.bytes_written += len(payload)
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows)
+            self._evict(conn)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_many({key: value}, ttl=ttl)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop expired entries, then least recently used ones until under `max_bytes`."""
+        self.stats.expired += conn.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self.stats.evictions += len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM entries")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_search_cache: Optional[DiskCache] = None
+
+def get_search_cache() -> Optional[DiskCache]:
+    """Return the process-wide search result cache, or None when caching is disabled."""
+    global _search_cache
+    if not SEARCH_CACHE_ENABLED:
+        return None
+    if _search_cache is None:
+        _search_cache = DiskCache(SEARCH_CACHE_PATH, SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_BYTES)
+    return _search_cache
+
+_tool_cache: Optional[DiskCache] = None
+
+def get_tool_cache() -> Optional[DiskCache]:
+    """Return the process-wide research tool result cache, or None when caching is disabled."""
+    global _tool_cache
+    if not TOOL_CACHE_ENABLED:
+        return None
+    if _tool_cache is None:
+        _tool_cache = DiskCache(TOOL_CACHE_PATH, TOOL_CACHE_TTL, TOOL_CACHE_MAX_BYTES)
+    return _tool_cache
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query for cache lookups (case and whitespace insensitive)."""
+    return " ".join(query.lower().split())
+
+def search_cache_key(backend: str, query: str, params: Dict[str, Any], normalize: Callable[[str], str] = normalize_query) -> str:
+    """Build the content-addressed cache key for a single query against a backend."""
+    material = json.dumps(
+        {"backend": backend, "query": normalize(query), "params": params},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def cache_search_results(backend: str,
+                         key_params: List[str],
+                         ttl: Optional[float] = None,
+                         normalize: Callable[[str], str] = normalize_query,
+                         cacheable: Optional[Callable[[Dict[str, Any]], bool]] = None):
+    """Decorator adding the on-disk cache to an async batch search function.
+
+    The wrapped function must take the list of queries as its first argument and return
+    one response per query, in order. Each query is looked up individually; only the
+    misses are passed on to the wrapped function, and their responses are stored under
+    a key built from the normalized query and the values of `key_params`.
+
+    Args:
+        backend: Name of the search provider, part of the cache key
+        key_params: Names of the function arguments that change the results
+        ttl: Time to live for stored responses, defaults to SEARCH_CACHE_TTL
+        normalize: Normalization applied to each query before keying, e.g. to keep URLs case sensitive
+        cacheable: Predicate on a response, False for responses that must not be stored
+            (e.g. failed fetches, which are retried on the next call); by default all are stored
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(search_queries, *args, **kwargs):
+            cache = get_search_cache()
+            if cache is None:
+                return await func(search_queries, *args, **kwargs)
+
+            # Key every query on the arguments that influence its results
+            bound = signature.bind(search_queries, *args, **kwargs)
+            bound.apply_defaults()
+            params = {name: bound.arguments[name] for name in key_params}
+            keys = [search_cache_key(backend, query, params, normalize) for query in search_queries]
+
+            cached = await asyncio.to_thread(cache.get_many, keys)
+
+            # Fetch each missing key once, even if the batch repeats a query
+            missing = {}
+            for query, key in zip(search_queries, keys):
+                if key not in cached and key not in missing:
+                    missing[key] = query
+            if missing:
+                bound.arguments[next(iter(signature.parameters))] = list(missing.values())
+                fetched = await func(*bound.args, **bound.kwargs)
+                fetched = dict(zip(missing.keys(), fetched))
+                storable = {key: response for key, response in fetched.items() if cacheable is None or cacheable(response)}
+                if storable:
+                    await asyncio.to_thread(cache.set_many, storable, ttl)
+                cached.update(fetched)
+
+            logger = NewsletterLogger.get_current_logger()
+            if logger:
+                logger.log_metrics("search_cache", cache.stats.as_dict(), context=backend)
+
+            # Keep the caller's query string on each response
+            return [dict(cached[key], query=query) for query, key in zip(search_queries, keys)]
+
+        return wrapper
+    return decorator
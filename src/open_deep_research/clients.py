@@ -0,0 +1,115 @@
+import functools
+import os
+from typing import Optional, Tuple
+
+from src.open_deep_research.configuration import Configuration
+from src.open_deep_research.llm_cache import get_llm_cache
+from src.open_deep_research.prompt_cache import get_prompt_cache_handler
+
+# Provider endpoints can be redirected, e.g. to the local stand-in server in stub_server.py
+TAVILY_BASE_URL = os.environ.get("TAVILY_BASE_URL")
+
+# Clients and tools are created on first use and then reused. Provider SDKs are imported
+# inside the factories: importing the graphs stays fast and works without API keys, and
+# a missing key only fails the first call that needs the client.
+
+@functools.cache
+def get_chat_model(provider: str, model: str, temperature: Optional[float] = None):
+    """Return the chat model for a provider ("anthropic", "openai" or "groq") and model name.
+
+    The model checks the LLM response cache on every call; the cache itself decides
+    whether the calling node uses it (see llm_cache.py). The prompt tokens each call
+    read from the provider's prompt cache are logged (see prompt_cache.py).
+    """
+    kwargs = {"cache": get_llm_cache(), "callbacks": [get_prompt_cache_handler()]}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    if provider == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+        return ChatAnthropic(model=model, **kwargs)
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+        # Report usage on streamed calls too (see token_stream.py)
+        return ChatOpenAI(model=model, stream_usage=True, **kwargs)
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+        return ChatGroq(model=model, **kwargs)
+    raise ValueError(f"Unsupported model provider: {provider}")
+
+def get_writer_model():
+    """The Anthropic model both graphs write with."""
+    return get_chat_model("anthropic", Configuration.writer_model, temperature=0)
+
+def get_planner_model():
+    """The OpenAI model the newsletter graph plans with."""
+    return get_chat_model("openai", Configuration.planner_model)
+
+def _unsupported_tavily_redirect(attribute: str) -> RuntimeError:
+    return RuntimeError(
+        f"TAVILY_BASE_URL is set but this tavily-python version has no `{attribute}` to redirect "
+        "the client with; install tavily-python 0.5.x or unset TAVILY_BASE_URL"
+    )
+
+@functools.cache
+def get_tavily_client():
+    from tavily import TavilyClient
+    client = TavilyClient()
+    if TAVILY_BASE_URL:
+        # The Tavily clients have no base URL option
+        if not hasattr(client, "base_url"):
+            raise _unsupported_tavily_redirect("base_url")
+        client.base_url = TAVILY_BASE_URL
+    return client
+
+@functools.cache
+def get_tavily_async_client():
+    from tavily import AsyncTavilyClient
+    client = AsyncTavilyClient()
+    if TAVILY_BASE_URL:
+        # Relies on the private HTTP client factory of tavily-python 0.5; fail rather than
+        # silently sending stub traffic to the real API when it changes
+        if not callable(getattr(client, "_client_creator", None)):
+            raise _unsupported_tavily_redirect("_client_creator")
+        create_http_client = client._client_creator
+
+        def create_redirected_http_client():
+            http_client = create_http_client()
+            http_client.base_url = TAVILY_BASE_URL
+            return http_client
+
+        client._client_creator = create_redirected_http_client
+    return client
+
+@functools.cache
+def get_research_tools() -> Tuple:
+    """The tools of the newsletter research agent: Tavily, then PubMed and arXiv (cached, see research_tools.py)."""
+    from langchain_community.agent_toolkits.load_tools import load_tools
+    from langchain_community.tools import TavilySearchResults
+    from langchain_community.tools.pubmed.tool import PubmedQueryRun
+
+    from src.open_deep_research.research_tools import (
+        BatchedPubMedAPIWrapper,
+        cached_tools,
+    )
+
+    tavily_tool = TavilySearchResults(
+        max_results=3,
+        search_depth="advanced",
+        include_answer=True,
+        include_raw_content=True,
+        include_images=False,
+        # include_domains=[...],
+        # exclude_domains=[...],
+        # name="...",            # overwrite default tool name
+        # description="...",     # overwrite default tool description
+        # args_schema=...,       # overwrite default args_schema: BaseModel
+    )
+    # PubMed and arXiv are blocking clients; run them cached on a bounded thread pool
+    return (tavily_tool,) + tuple(cached_tools(
+        [PubmedQueryRun(api_wrapper=BatchedPubMedAPIWrapper())] + load_tools(["arxiv"])
+    ))
+
+@functools.cache
+def get_model_with_tools(provider: str, model: str, temperature: Optional[float] = None):
+    """Return the chat model for `provider` and `model` with the research tools bound."""
+    return get_chat_model(provider, model, temperature).bind_tools(list(get_research_tools()))
@@ -0,0 +1,334 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Union
+
+from src.open_deep_research.logger import MetricCounters, NewsletterLogger
+
+
+@dataclass
+class SingleFlightStats(MetricCounters):
+    """Counters for request coalescing."""
+    calls: int = 0 # Total calls made through the group
+    executed: int = 0 # Calls that actually reached the provider
+    coalesced: int = 0 # Duplicate calls that joined an in-flight request instead
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key onto a single in-flight request.
+
+    The first caller for a key starts the request; callers arriving while it is still
+    running await the same future instead of issuing their own. Once the request
+    finishes the key is released, so later calls start fresh (caching is handled
+    separately). The shared future is shielded, so one caller being cancelled does not
+    cancel the request for the others.
+    """
+
+    def __init__(self):
+        self.stats = SingleFlightStats()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats.calls += 1
+        future = self._in_flight.get(key)
+        if future is not None and future.get_loop() is asyncio.get_running_loop():
+            self.stats.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.stats.executed += 1
+        future = asyncio.ensure_future(fn())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda done: self._release(key, done))
+        return await asyncio.shield(future)
+
+    def _release(self, key: str, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # Mark the exception as retrieved when every caller has already gone away
+        if not future.cancelled():
+            future.exception()
+
+def http_status_code(error: BaseException) -> Optional[int]:
+    """Best-effort extraction of the HTTP status code carried by a client error."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+def is_overload_status(status: Optional[int]) -> bool:
+    """Whether a status code means the provider wants us to slow down (429 or 5xx)."""
+    return status is not None and (status == 429 or status >= 500)
+
+@dataclass
+class GovernorStats(MetricCounters):
+    """Counters for a provider governor."""
+    requests: int = 0 # Requests admitted through the governor
+    overloaded: int = 0 # Requests that came back with a 429 or 5xx
+    limit_decreases: int = 0 # Times the concurrency limit was cut
+    queue_wait_total: float = 0.0 # Seconds spent waiting for a slot, summed over requests
+    queue_wait_max: float = 0.0 # Longest single wait for a slot
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = super().as_dict()
+        stats["queue_wait_total"] = round(self.queue_wait_total, 3)
+        stats["queue_wait_max"] = round(self.queue_wait_max, 3)
+        stats["queue_wait_avg"] = round(self.queue_wait_total / self.requests, 3) if self.requests else 0.0
+        return stats
+
+class ProviderGovernor:
+    """Rate limiter and adaptive concurrency limit for one search provider.
+
+    Requests are admitted through a token bucket (`rps` tokens per second, up to `burst`
+    saved) and an AIMD concurrency limit between 1 and `max_in_flight`: every 429/5xx
+    response halves the limit (at most once per `cooldown` seconds) and drains the
+    bucket, while each full window of successful requests grows it back by one.
+    """
+
+    def __init__(self,
+                 name: str,
+                 rps: float,
+                 burst: int,
+                 max_in_flight: int,
+                 status_code: Callable[[BaseException], Optional[int]] = http_status_code,
+                 cooldown: float = 1.0):
+        self.name = name
+        self.rps = rps
+        self.burst = max(1, burst)
+        self.max_in_flight = max(1, max_in_flight)
+        self.limit = self.max_in_flight
+        self.status_code = status_code
+        self.cooldown = cooldown
+        self.stats = GovernorStats()
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rps > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rps)
+        else:
+            self._tokens = float(self.burst)
+        self._refilled_at = now
+
+    async def _acquire(self) -> None:
+        while True:
+            self._refill()
+            if self._in_flight < self.limit and self._tokens >= 1:
+                self._tokens -= 1
+                self._in_flight += 1
+                return
+            if self._in_flight >= self.limit:
+                # Wait for a running request to finish
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    # Pass on a wake-up we received but can no longer use
+                    if waiter.done() and not waiter.cancelled():
+                        self._wake()
+                    raise
+                finally:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+            else:
+                # Wait for the bucket to refill one token
+                await asyncio.sleep((1 - self._tokens) / self.rps)
+
+    def _wake(self, count: int = 1) -> None:
+        while count > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            try:
+                waiter.set_result(None)
+                count -= 1
+            except RuntimeError:
+                # The waiter belongs to an event loop that has been closed
+                pass
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake()
+
+    def record_success(self) -> None:
+        """Additive increase: grow the limit by one after `limit` consecutive successes."""
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_in_flight:
+            self.limit += 1
+            self._successes = 0
+            self._wake()
+
+    def record_overload(self) -> None:
+        """Multiplicative decrease: halve the limit and pause the bucket."""
+        self.stats.overloaded += 1
+        self._successes = 0
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(1, self.limit // 2)
+        self._tokens = 0.0
+        self.stats.limit_decreases += 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one admitted request slot, recording the time spent queueing for it."""
+        started = time.monotonic()
+        await self._acquire()
+        waited = time.monotonic() - started
+        self.stats.requests += 1
+        self.stats.queue_wait_total += waited
+        self.stats.queue_wait_max = max(self.stats.queue_wait_max, waited)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` inside a slot and feed the outcome back into the concurrency limit."""
+        async with self.slot():
+            try:
+                result = await fn()
+            except Exception as error:
+                if is_overload_status(self.status_code(error)):
+                    self.record_overload()
+                raise
+        self.record_success()
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats.as_dict(), "limit": self.limit, "in_flight": self._in_flight}
+
+@dataclass
+class RequestPolicyStats(MetricCounters):
+    """Counters for retries and hedged requests."""
+    requests: int = 0 # Logical requests run through the policy
+    retries: int = 0 # Extra attempts after a retryable failure
+    hedges: int = 0 # Duplicate requests sent because the first one was slow
+    hedge_wins: int = 0 # Hedged duplicates that answered first
+    failures: int = 0 # Requests that failed after every attempt
+
+class LatencyTracker:
+    """Rolling window of request latencies used to derive the hedging delay."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th quantile (0-1), or None until enough samples were seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class RequestPolicy:
+    """Retry with bounded exponential backoff and full jitter, plus optional hedging.
+
+    Each attempt may be hedged: if no answer arrived after `hedge_delay` seconds a
+    duplicate request is sent and whichever finishes first wins, the other is cancelled.
+    `hedge_delay` is a number of seconds, "auto" to use the observed p95 latency, or
+    None to disable hedging. Failed attempts for which `retryable` returns True are
+    retried up to `attempts` times in total, sleeping a random time between 0 and
+    min(`max_delay`, `base_delay` * 2**n) in between.
+    """
+
+    def __init__(self,
+                 attempts: int = 3,
+                 base_delay: float = 0.5,
+                 max_delay: float = 8.0,
+                 hedge_delay: Optional[Union[float, str]] = None,
+                 retryable: Callable[[BaseException], bool] = lambda error: is_overload_status(http_status_code(error))):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_delay = hedge_delay
+        self.retryable = retryable
+        self.latencies = LatencyTracker()
+        self.stats = RequestPolicyStats()
+
+    def _current_hedge_delay(self) -> Optional[float]:
+        if self.hedge_delay == "auto":
+            return self.latencies.percentile(0.95)
+        return self.hedge_delay
+
+    async def _timed(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.monotonic()
+        result = await fn()
+        self.latencies.record(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        delay = self._current_hedge_delay()
+        primary = asyncio.ensure_future(self._timed(fn))
+        if delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.stats.hedges += 1
+                tasks.add(asyncio.ensure_future(self._timed(fn)))
+            # Take the first success; only fail once every copy has failed
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    if winners[0] is not primary:
+                        self.stats.hedge_wins += 1
+                    return winners[0].result()
+                if not tasks:
+                    raise next(iter(done)).exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats.requests += 1
+        for attempt in range(self.attempts):
+            try:
+                return await self._hedged(fn)
+            except Exception as error:
+                if attempt + 1 >= self.attempts or not self.retryable(error):
+                    self.stats.failures += 1
+                    raise
+            self.stats.retries += 1
+            await asyncio.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+class SearchControls:
+    """Request controls for one search provider, applied around every provider call.
+
+    Identical calls in flight are coalesced first; the remaining call runs under the
+    retry/hedging policy, and every attempt (including hedges) takes a governor slot.
+    """
+
+    def __init__(self, name: str, governor: ProviderGovernor, policy: RequestPolicy):
+        self.name = name
+        self.single_flight = SingleFlight()
+        self.governor = governor
+        self.policy = policy
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        return await self.single_flight.do(key, lambda: self.policy.run(lambda: self.governor.call(fn)))
+
+    def log_metrics(self) -> None:
+        """Report the counters of every layer through the current run logger."""
+        logger = NewsletterLogger.get_current_logger()
+        if logger:
+            logger.log_metrics("search_single_flight", self.single_flight.stats.as_dict(), context=self.name)
+            logger.log_metrics("search_governor", self.governor.metrics(), context=self.name)
+            logger.log_metrics("search_requests", self.policy.stats.as_dict(), context=self.name)
+
+    def reset(self) -> None:
+        for layer in (self.single_flight, self.governor, self.policy):
+            layer.stats.reset()
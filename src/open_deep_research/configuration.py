@@ -16,6 +16,7 @@ No default report structure. Come up with a structure that makes sense for the u
 class SearchAPI(Enum):
     PERPLEXITY = "perplexity"
     TAVILY = "tavily"
+    LOCAL = "local"
 
 class PlannerProvider(Enum):
     OPENAI = "openai"
@@ -105,6 +106,21 @@ class Configuration:
     planner_model: str = "o3-mini" # Defaults to OpenAI o3-mini as planner model
     writer_model: str = "claude-3-5-sonnet-latest" # Defaults to Anthropic as provider
     search_api: SearchAPI = SearchAPI.TAVILY # Default to TAVILY
+    local_search_first: bool = False # Answer queries from the local index (LOCAL_SEARCH_DIR) first and only send the rest to search_api
+    local_search_min_coverage: float = 1.0 # Share of a query's terms the best local match must contain to answer it locally
+    max_concurrent_searches: int = 5 # Maximum number of search requests in flight per batch
+    query_similarity_threshold: Optional[float] = None # Queries at least this similar (TF-IDF cosine after normalization) are searched once, e.g. 0.85; off when unset
+    stream_search_results: bool = False # Format sources as each search completes instead of waiting for the whole batch
+    near_duplicate_threshold: Optional[float] = None # Drop sources whose text is at least this similar to a higher-scoring source, e.g. 0.9; off when unset
+    source_token_budget: Optional[int] = None # Total token budget for the formatted sources, split across sources by relevance; with streaming, remaining searches are cancelled once it can be filled
+    source_extraction: str = "head" # Part of the raw content kept per source: "head" (beginning of the page) or "bm25" (passages matching the queries)
+    raw_content_top_k: Optional[int] = None # Two-phase search: snippets for every query, then full page content only for this many top-ranked sources
+    prefetch_searches: bool = False # Search for the topic while the report planner LLM runs
+    prefetch_max_queries: int = 3 # Maximum number of speculative queries per run
+    llm_cache: bool = False # Reuse stored completions for identical model, parameters and messages
+    llm_cache_disabled_nodes: Optional[List[str]] = None # Graph nodes that always call the model, even with llm_cache on
+    stream_tokens: bool = False # Send the tokens of sections, research summaries and drafts to the custom stream (stream_mode="custom") as they are generated
+    store_large_text_as_blobs: bool = False # Keep large texts (sources, tool outputs, research outputs) in the blob store and only references in the graph state
     newsletter_metadata: NewsletterMetadata = field(default_factory=create_default_newsletter_metadata)
 
     @classmethod
@@ -1,10 +1,7 @@
 from typing import Literal
 
-from langchain_anthropic import ChatAnthropic 
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
 
 from langgraph.constants import Send
 from langgraph.graph import START, END, StateGraph
@@ -13,10 +10,11 @@ from langgraph.types import interrupt, Command
 from src.open_deep_research.state import ReportStateInput, ReportStateOutput, Sections, ReportState, SectionState, SectionOutputState, Queries, Feedback
 from src.open_deep_research.prompts import report_planner_query_writer_instructions, report_planner_instructions, query_writer_instructions, section_writer_instructions, final_section_writer_instructions, section_grader_instructions
 from src.open_deep_research.configuration import Configuration
-from src.open_deep_research.utils import tavily_search_async, deduplicate_and_format_sources, format_sections, perplexity_search
-
-# Set writer model
-writer_model = ChatAnthropic(model=Configuration.writer_model, temperature=0) 
+from src.open_deep_research.utils import deduplicate_and_format_sources, format_sections, collapse_queries
+from src.open_deep_research.search_backends import get_search_backend, search_with_lazy_raw_content, stream_search_and_format, speculative_queries, SearchPrefetcher
+from src.open_deep_research.blob_store import store_text, resolve_text
+from src.open_deep_research.clients import get_chat_model, get_writer_model
+from src.open_deep_research.token_stream import generate_streamed
 
 # Nodes
 async def generate_report_plan(state: ReportState, config: RunnableConfig):
@@ -35,35 +33,43 @@ async def generate_report_plan(state: ReportState, config: RunnableConfig):
     if isinstance(report_structure, dict):
         report_structure = str(report_structure)
 
+    # Search for the topic itself while the planning queries are generated
+    search_backend = get_search_backend(configurable.search_api, configurable.local_search_first, configurable.local_search_min_coverage)
+    prefetcher = None
+    if configurable.prefetch_searches:
+        prefetcher = SearchPrefetcher(
+            search_backend,
+            speculative_queries(topic, max_queries=configurable.prefetch_max_queries),
+            include_raw_content=False,
+            max_concurrency=configurable.max_concurrent_searches,
+            similarity_threshold=configurable.query_similarity_threshold
+        )
+
     # Generate search query
-    structured_llm = writer_model.with_structured_output(Queries)
+    structured_llm = get_writer_model().with_structured_output(Queries)
 
     # Format system instructions
     system_instructions_query = report_planner_query_writer_instructions.format(topic=topic, report_organization=report_structure, number_of_queries=number_of_queries)
 
-    # Generate queries  
-    results = structured_llm.invoke([SystemMessage(content=system_instructions_query)]+[HumanMessage(content="Generate search queries that will help with planning the sections of the report.")])
+    # Generate queries, without blocking the event loop so the prefetch keeps running
+    try:
+        results = await structured_llm.ainvoke([SystemMessage(content=system_instructions_query)]+[HumanMessage(content="Generate search queries that will help with planning the sections of the report.")])
+    except BaseException:
+        # Do not leave the speculative searches running when the planner call fails
+        if prefetcher:
+            prefetcher.cancel()
+        raise
 
     # Web search
-    query_list = [query.search_query for query in results.queries]
+    query_list = collapse_queries([query.search_query for query in results.queries], configurable.query_similarity_threshold)
 
-    # Handle both cases for search_api:
-    # 1. When selected in Studio UI -> returns a string (e.g. "tavily")
-    # 2. When using default -> returns an Enum (e.g. SearchAPI.TAVILY)
-    if isinstance(configurable.search_api, str):
-        search_api = configurable.search_api
+    # Search the web, the planner only needs snippets
+    if prefetcher:
+        # The speculative results go into the planner context as well
+        search_results = await prefetcher.search(search_backend, query_list + prefetcher.queries, include_raw_content=False, max_concurrency=configurable.max_concurrent_searches)
     else:
-        search_api = configurable.search_api.value
-
-    # Search the web
-    if search_api == "tavily":
-        search_results = await tavily_search_async(query_list)
-        source_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=1000, include_raw_content=False)
-    elif search_api == "perplexity":
-        search_results = perplexity_search(query_list)
-        source_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=1000, include_raw_content=False)
-    else:
-        raise ValueError(f"Unsupported search API: {configurable.search_api}")
+        search_results = await search_backend.search(query_list, include_raw_content=False, max_concurrency=configurable.max_concurrent_searches)
+    source_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=1000, include_raw_content=False)
 
     # Format system instructions
     system_instructions_sections = report_planner_instructions.format(topic=topic, report_organization=report_structure, context=source_str, feedback=feedback)
@@ -75,16 +81,14 @@ async def generate_report_plan(state: ReportState, config: RunnableConfig):
         planner_provider = configurable.planner_provider.value
 
     # Set the planner model
-    if  planner_provider == "openai":
-        planner_llm = ChatOpenAI(model=configurable.planner_model) 
-    elif planner_provider == "groq":
-        planner_llm = ChatGroq(model=configurable.planner_model)
+    if planner_provider in ("openai", "groq"):
+        planner_llm = get_chat_model(planner_provider, configurable.planner_model)
     else:
         raise ValueError(f"Unsupported search API: {configurable.search_api}")
 
     # Generate sections 
     structured_llm = planner_llm.with_structured_output(Sections)
-    report_sections = structured_llm.invoke([SystemMessage(content=system_instructions_sections)]+[HumanMessage(content="Generate the sections of the report. Your response must include a 'sections' field containing a list of sections. Each section must have: name, description, plan, research, and content fields.")])
+    report_sections = await structured_llm.ainvoke([SystemMessage(content=system_instructions_sections)]+[HumanMessage(content="Generate the sections of the report. Your response must include a 'sections' field containing a list of sections. Each section must have: name, description, plan, research, and content fields.")])
 
     # Get sections
     sections = report_sections.sections
@@ -125,7 +129,7 @@ def human_feedback(state: ReportState, config: RunnableConfig) -> Command[Litera
     else:
         raise TypeError(f"Interrupt value of type {type(feedback)} is not supported.")
     
-def generate_queries(state: SectionState, config: RunnableConfig):
+async def generate_queries(state: SectionState, config: RunnableConfig):
     """ Generate search queries for a report section """
 
     # Get state 
@@ -136,13 +140,13 @@ def generate_queries(state: SectionState, config: RunnableConfig):
     number_of_queries = configurable.number_of_queries
 
     # Generate queries 
-    structured_llm = writer_model.with_structured_output(Queries)
+    structured_llm = get_writer_model().with_structured_output(Queries)
 
     # Format system instructions
     system_instructions = query_writer_instructions.format(section_topic=section.description, number_of_queries=number_of_queries)
 
     # Generate queries  
-    queries = structured_llm.invoke([SystemMessage(content=system_instructions)]+[HumanMessage(content="Generate search queries on the provided topic.")])
+    queries = await structured_llm.ainvoke([SystemMessage(content=system_instructions)]+[HumanMessage(content="Generate search queries on the provided topic.")])
 
     return {"search_queries": queries.queries}
 
@@ -156,34 +160,30 @@ async def search_web(state: SectionState, config: RunnableConfig):
     configurable = Configuration.from_runnable_config(config)
 
     # Web search
-    query_list = [query.search_query for query in search_queries]
+    query_list = collapse_queries([query.search_query for query in search_queries], configurable.query_similarity_threshold)
     
-    # Handle both cases for search_api:
-    # 1. When selected in Studio UI -> returns a string (e.g. "tavily")
-    # 2. When using default -> returns an Enum (e.g. SearchAPI.TAVILY)
-    if isinstance(configurable.search_api, str):
-        search_api = configurable.search_api
+    # Search the web, with full page content when the backend provides it
+    search_backend = get_search_backend(configurable.search_api, configurable.local_search_first, configurable.local_search_min_coverage)
+    include_raw_content = search_backend.capabilities.supports_raw_content
+    lazy_raw_content = include_raw_content and configurable.raw_content_top_k and search_backend.capabilities.supports_lazy_raw_content
+    if configurable.stream_search_results and not lazy_raw_content:
+        source_str, search_results = await stream_search_and_format(search_backend, query_list, max_tokens_per_source=5000, include_raw_content=include_raw_content, token_budget=configurable.source_token_budget, max_concurrency=configurable.max_concurrent_searches, near_duplicate_threshold=configurable.near_duplicate_threshold, extraction=configurable.source_extraction)
     else:
-        search_api = configurable.search_api.value
-
-    # Search the web
-    if search_api == "tavily":
-        search_results = await tavily_search_async(query_list)
-        source_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=5000, include_raw_content=True)
-    elif search_api == "perplexity":
-        search_results = perplexity_search(query_list)
-        source_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=5000, include_raw_content=False)
-    else:
-        raise ValueError(f"Unsupported search API: {configurable.search_api}")
+        if lazy_raw_content:
+            # Snippets for every query first, then full content only for the top-ranked sources
+            search_results = await search_with_lazy_raw_content(search_backend, query_list, configurable.raw_content_top_k, max_concurrency=configurable.max_concurrent_searches)
+        else:
+            search_results = await search_backend.search(query_list, include_raw_content=include_raw_content, max_concurrency=configurable.max_concurrent_searches)
+        source_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=5000, include_raw_content=include_raw_content, near_duplicate_threshold=configurable.near_duplicate_threshold, extraction=configurable.source_extraction, token_budget=configurable.source_token_budget)
 
-    return {"source_str": source_str, "search_iterations": state["search_iterations"] + 1}
+    return {"source_str": store_text(source_str, configurable.store_large_text_as_blobs), "search_iterations": state["search_iterations"] + 1}
 
-def write_section(state: SectionState, config: RunnableConfig) -> Command[Literal[END,"search_web"]]:
+async def write_section(state: SectionState, config: RunnableConfig) -> Command[Literal[END,"search_web"]]:
     """ Write a section of the report """
 
     # Get state 
     section = state["section"]
-    source_str = state["source_str"]
+    source_str = resolve_text(state["source_str"])
 
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
@@ -191,8 +191,8 @@ def write_section(state: SectionState, config: RunnableConfig) -> Command[Litera
     # Format system instructions
     system_instructions = section_writer_instructions.format(section_title=section.name, section_topic=section.description, context=source_str, section_content=section.content)
 
-    # Generate section  
-    section_content = writer_model.invoke([SystemMessage(content=system_instructions)]+[HumanMessage(content="Generate a report section based on the provided sources.")])
+    # Generate section, streaming its tokens when enabled
+    section_content = await generate_streamed(get_writer_model(), [SystemMessage(content=system_instructions)]+[HumanMessage(content="Generate a report section based on the provided sources.")], section=section.name)
     
     # Write content to the section object  
     section.content = section_content.content
@@ -201,8 +201,8 @@ def write_section(state: SectionState, config: RunnableConfig) -> Command[Litera
     section_grader_instructions_formatted = section_grader_instructions.format(section_topic=section.description,section=section.content)
 
     # Feedback 
-    structured_llm = writer_model.with_structured_output(Feedback)
-    feedback = structured_llm.invoke([SystemMessage(content=section_grader_instructions_formatted)]+[HumanMessage(content="Grade the report and consider follow-up questions for missing information:")])
+    structured_llm = get_writer_model().with_structured_output(Feedback)
+    feedback = await structured_llm.ainvoke([SystemMessage(content=section_grader_instructions_formatted)]+[HumanMessage(content="Grade the report and consider follow-up questions for missing information:")])
 
     if feedback.grade == "pass" or state["search_iterations"] >= configurable.max_search_depth:
         # Publish the section to completed sections 
@@ -217,7 +217,7 @@ def write_section(state: SectionState, config: RunnableConfig) -> Command[Litera
         goto="search_web"
         )
     
-def write_final_sections(state: SectionState):
+async def write_final_sections(state: SectionState):
     """ Write final sections of the report, which do not require web search and use the completed sections as context """
 
     # Get state 
@@ -227,8 +227,8 @@ def write_final_sections(state: SectionState):
     # Format system instructions
     system_instructions = final_section_writer_instructions.format(section_title=section.name, section_topic=section.description, context=completed_report_sections)
 
-    # Generate section  
-    section_content = writer_model.invoke([SystemMessage(content=system_instructions)]+[HumanMessage(content="Generate a report section based on the provided sources.")])
+    # Generate section, streaming its tokens when enabled
+    section_content = await generate_streamed(get_writer_model(), [SystemMessage(content=system_instructions)]+[HumanMessage(content="Generate a report section based on the provided sources.")], section=section.name)
     
     # Write content to section 
     section.content = section_content.content
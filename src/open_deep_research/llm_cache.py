@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import warnings
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langgraph.config import get_config
+from pydantic import BaseModel
+
+from src.open_deep_research.cache import CACHE_DIR, DiskCache
+from src.open_deep_research.configuration import Configuration
+from src.open_deep_research.logger import MetricCounters, NewsletterLogger
+
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", str(CACHE_DIR / "llm_cache.sqlite"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 60 * 60)) # Seconds a cached completion stays fresh
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024)) # Size bound before LRU eviction
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+@dataclass
+class LLMCacheStats(MetricCounters):
+    """Cache lookups of one graph node."""
+    hits: int = 0
+    misses: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = super().as_dict()
+        lookups = self.hits + self.misses
+        stats["hit_rate"] = round(self.hits / lookups, 3) if lookups else 0.0
+        return stats
+
+def llm_cache_key(prompt: str, llm_string: str) -> str:
+    """Build the cache key for a completion: the model with its parameters and bound tools, and the messages."""
+    material = json.dumps({"llm": llm_string, "prompt": prompt})
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def _current_node() -> Optional[str]:
+    """Return the graph node making the current LLM call, or None when it should not be cached.
+
+    Caching is opt-in per run through the `llm_cache` configuration, and nodes listed in
+    `llm_cache_disabled_nodes` always call the model. Calls made outside a graph follow
+    the environment, like the rest of the configuration.
+    """
+    try:
+        config = get_config()
+    except RuntimeError:
+        config = None
+    configurable = Configuration.from_runnable_config(config)
+    node = (config or {}).get("metadata", {}).get("langgraph_node", "")
+    if not configurable.llm_cache or node in (configurable.llm_cache_disabled_nodes or []):
+        return None
+    return node
+
+PARSED_MODEL_KEY = "__pydantic_model__"
+# Set in the response metadata of restored messages; their usage was not billed again
+CACHE_HIT_KEY = "llm_cache_hit"
+
+def _encode_generations(generations: RETURN_VAL_TYPE) -> Optional[str]:
+    """Serialize generations for storage, or return None when they cannot be restored.
+
+    OpenAI structured output puts the parsed Pydantic object in the message's
+    `additional_kwargs`; it is stored as its class path and data and rebuilt on lookup.
+    """
+    encoded = []
+    for generation in generations:
+        message = getattr(generation, "message", None)
+        parsed = message.additional_kwargs.get("parsed") if message is not None else None
+        if isinstance(parsed, BaseModel):
+            model = type(parsed)
+            additional_kwargs = dict(message.additional_kwargs, parsed={
+                PARSED_MODEL_KEY: f"{model.__module__}:{model.__qualname__}",
+                "data": parsed.model_dump(mode="json")
+            })
+            generation = generation.model_copy(update={"message": message.model_copy(update={"additional_kwargs": additional_kwargs})})
+        encoded.append(generation)
+    value = dumps(encoded)
+    return None if '"not_implemented"' in value else value
+
+def _decode_generations(value: str) -> RETURN_VAL_TYPE:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", LangChainBetaWarning)
+        generations = loads(value)
+    for generation in generations:
+        message = getattr(generation, "message", None)
+        if message is not None:
+            message.response_metadata[CACHE_HIT_KEY] = True
+        parsed = message.additional_kwargs.get("parsed") if message is not None else None
+        if isinstance(parsed, dict) and PARSED_MODEL_KEY in parsed:
+            module, qualname = parsed[PARSED_MODEL_KEY].split(":")
+            model = importlib.import_module(module)
+            for name in qualname.split("."):
+                model = getattr(model, name)
+            message.additional_kwargs["parsed"] = model.model_validate(parsed["data"])
+    return generations
+
+class LLMResponseCache(BaseCache):
+    """Exact-match completion cache on disk, plugged into the chat models as their `cache`.
+
+    A completion is reused only for the same model, parameters, bound tools and messages
+    (see `llm_cache_key`), so it is meant for deterministic calls: temperature 0 writers,
+    graders, query generation, and planner prompts rebuilt unchanged after feedback or
+    in a repeat edition. Entries are kept in a `DiskCache` with TTL and LRU eviction.
+    Whether a call uses the cache is decided per call from the node's configuration,
+    and hits and misses are counted per node.
+    """
+
+    def __init__(self, cache: DiskCache):
+        self.cache = cache
+        self.node_stats: Dict[str, LLMCacheStats] = {}
+
+    def _lookup(self, node: str, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self.cache.get(llm_cache_key(prompt, llm_string))
+        stats = self.node_stats.setdefault(node, LLMCacheStats())
+        if value is None:
+            stats.misses += 1
+        else:
+            stats.hits += 1
+
+        logger = NewsletterLogger.get_current_logger()
+        if logger:
+            logger.log_metrics("llm_cache", stats.as_dict(), context=node or "no_node")
+        return _decode_generations(value) if value is not None else None
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        node = _current_node()
+        if node is None:
+            return None
+        return self._lookup(node, prompt, llm_string)
+
+    def _update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = _encode_generations(return_val)
+        if value is not None:
+            self.cache.set(llm_cache_key(prompt, llm_string), value)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if _current_node() is not None:
+            self._update(prompt, llm_string, return_val)
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        node = _current_node()
+        if node is None:
+            return None
+        return await asyncio.to_thread(self._lookup, node, prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if _current_node() is not None:
+            await asyncio.to_thread(self._update, prompt, llm_string, return_val)
+
+    def clear(self, **kwargs) -> None:
+        self.cache.clear()
+
+    def reset_stats(self) -> None:
+        self.node_stats.clear()
+        self.cache.stats.reset()
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the process-wide LLM response cache, or None when it is disabled for the process."""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(DiskCache(LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES))
+    return _llm_cache
@@ -0,0 +1,355 @@
+import argparse
+import html
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import warnings
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.open_deep_research.cache import CACHE_DIR
+from src.open_deep_research.text_processing import (
+    BM25_B,
+    BM25_K1,
+    bm25_scores,
+    normalize_query_terms,
+    split_passages,
+    stem,
+    words,
+)
+
+# Directory of documents to index, and where the index lives
+LOCAL_SEARCH_DIR = os.environ.get("LOCAL_SEARCH_DIR", "")
+LOCAL_INDEX_DIR = os.environ.get("LOCAL_INDEX_DIR", str(CACHE_DIR / "local_index"))
+
+INDEXED_EXTENSIONS = (".txt", ".md", ".html", ".htm", ".json")
+POSTING_DTYPE = np.dtype([("doc", "<u4"), ("tf", "<u4")])
+MAX_SEGMENTS = 16 # Segments are merged once an update would leave more than this
+SNIPPET_CHARS = 500
+
+HTML_TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+HTML_DROP_PATTERN = re.compile(r"<(script|style|noscript)\b.*?</\1>", re.IGNORECASE | re.DOTALL)
+HTML_BLOCK_PATTERN = re.compile(r"</?(p|div|br|li|h[1-6]|tr|section|article)\b[^>]*>", re.IGNORECASE)
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+def load_document(path: Path) -> Tuple[str, str, str]:
+    """Read a document from the corpus and return its (url, title, text).
+
+    JSON files are expected to hold a fetched page in the Tavily result format (`url`,
+    `title` and `raw_content` or `content`); HTML is reduced to its visible text; other
+    files are read as plain text, titled by their first line.
+    """
+    source = path.read_text(encoding="utf-8", errors="replace")
+    url = path.resolve().as_uri()
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        page = json.loads(source)
+        text = page.get("raw_content") or page.get("content") or ""
+        return page.get("url") or url, page.get("title") or path.stem, text
+    if suffix in (".html", ".htm"):
+        match = HTML_TITLE_PATTERN.search(source)
+        title = html.unescape(match.group(1)).strip() if match else path.stem
+        text = HTML_DROP_PATTERN.sub(" ", source)
+        text = HTML_BLOCK_PATTERN.sub("\n", text)
+        text = html.unescape(HTML_TAG_PATTERN.sub(" ", text))
+        text = "\n".join(" ".join(line.split()) for line in text.splitlines() if line.strip())
+        return url, title or path.stem, text
+    first_line = next((line for line in source.splitlines() if line.strip()), path.stem)
+    return url, first_line.strip().lstrip("#").strip(), source
+
+def index_terms(text: str) -> List[str]:
+    """Terms indexed for a document, normalized like queries (see `normalize_query_terms`)."""
+    return [stem(word) for word in words(text)]
+
+def term_coverage(query: str, text: str) -> float:
+    """Share of the query's normalized terms that occur in `text`, from 0 to 1."""
+    terms = set(normalize_query_terms(query))
+    if not terms:
+        return 0.0
+    return len(terms.intersection(index_terms(text))) / len(terms)
+
+class LocalIndex:
+    """On-disk inverted index over a directory of documents, searched with BM25.
+
+    The index is made of immutable segments. Each segment has a postings file, an array
+    of (doc id, term frequency) pairs grouped by term that is memory-mapped when
+    searching, so the postings never need to fit in RAM. A SQLite catalog holds the
+    documents and the position of each term's postings in each segment.
+
+    `update` is incremental: only new and modified files are indexed, into a new
+    segment, while modified and deleted files are marked dead and skipped when
+    searching. `compact` merges the segments and drops the dead postings.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = Path(index_dir)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._postings: Dict[int, np.ndarray] = {}
+        self._live: Optional[np.ndarray] = None
+        self._lengths: Optional[np.ndarray] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.index_dir / "catalog.sqlite"), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "doc_id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL, mtime REAL NOT NULL, size INTEGER NOT NULL, "
+                "url TEXT NOT NULL, title TEXT NOT NULL, length INTEGER NOT NULL, live INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS documents_path ON documents(path) WHERE live;"
+                "CREATE TABLE IF NOT EXISTS segments (segment_id INTEGER PRIMARY KEY AUTOINCREMENT, postings INTEGER NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS terms ("
+                "term TEXT NOT NULL, segment_id INTEGER NOT NULL, offset INTEGER NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (term, segment_id));"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _segment_path(self, segment_id: int) -> Path:
+        return self.index_dir / f"segment_{segment_id}.postings"
+
+    def _segment_postings(self, segment_id: int) -> np.ndarray:
+        postings = self._postings.get(segment_id)
+        if postings is None:
+            postings = self._postings[segment_id] = np.memmap(self._segment_path(segment_id), dtype=POSTING_DTYPE, mode="r")
+        return postings
+
+    def _document_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Liveness and length of every document, indexed by doc id."""
+        if self._live is None:
+            rows = self._connect().execute("SELECT doc_id, length, live FROM documents").fetchall()
+            size = max((row[0] for row in rows), default=0) + 1
+            self._live = np.zeros(size, dtype=bool)
+            self._lengths = np.zeros(size, dtype=np.float64)
+            for doc_id, length, live in rows:
+                self._live[doc_id] = bool(live)
+                self._lengths[doc_id] = length
+        return self._live, self._lengths
+
+    def _invalidate(self) -> None:
+        self._live = None
+        self._lengths = None
+        self._postings.clear()
+
+    def _write_segment(self, conn: sqlite3.Connection, postings: Dict[str, List[Tuple[int, int]]]) -> None:
+        """Write the postings of a batch of documents as a new segment."""
+        segment_id = conn.execute("INSERT INTO segments (postings) VALUES (0)").lastrowid
+        terms = sorted(postings)
+        array = np.array([posting for term in terms for posting in postings[term]], dtype=POSTING_DTYPE)
+        array.tofile(self._segment_path(segment_id))
+        rows = []
+        offset = 0
+        for term in terms:
+            rows.append((term, segment_id, offset, len(postings[term])))
+            offset += len(postings[term])
+        conn.executemany("INSERT INTO terms VALUES (?, ?, ?, ?)", rows)
+        conn.execute("UPDATE segments SET postings = ? WHERE segment_id = ?", (offset, segment_id))
+
+    def update(self, docs_dir: str) -> Dict[str, int]:
+        """Bring the index up to date with the files under `docs_dir`.
+
+        Returns:
+            The number of documents added, updated and removed.
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            conn = self._connect()
+            known = {
+                path: (doc_id, mtime, size)
+                for doc_id, path, mtime, size in conn.execute("SELECT doc_id, path, mtime, size FROM documents WHERE live")
+            }
+            changed = []
+            seen = set()
+            for path in sorted(Path(docs_dir).rglob("*")):
+                if path.suffix.lower() not in INDEXED_EXTENSIONS or not path.is_file():
+                    continue
+                key = str(path.resolve())
+                seen.add(key)
+                stat = path.stat()
+                if key in known and known[key][1:] == (stat.st_mtime, stat.st_size):
+                    continue
+                counts["updated" if key in known else "added"] += 1
+                changed.append((path, key, stat))
+            dead = [known[key][0] for key in known if key not in seen]
+            dead += [known[key][0] for _, key, _ in changed if key in known]
+            counts["removed"] = len(known) - len(seen.intersection(known))
+            if not changed and not dead:
+                return counts
+
+            with conn:
+                conn.executemany("UPDATE documents SET live = 0 WHERE doc_id = ?", [(doc_id,) for doc_id in dead])
+                postings = defaultdict(list)
+                for path, key, stat in changed:
+                    try:
+                        url, title, text = load_document(path)
+                    except (OSError, ValueError) as e:
+                        warnings.warn(f"Could not index {path}: {e}")
+                        continue
+                    terms = Counter(index_terms(text))
+                    doc_id = conn.execute(
+                        "INSERT INTO documents (path, mtime, size, url, title, length, live) VALUES (?, ?, ?, ?, ?, ?, 1)",
+                        (key, stat.st_mtime, stat.st_size, url, title, sum(terms.values()))
+                    ).lastrowid
+                    for term, tf in terms.items():
+                        postings[term].append((doc_id, tf))
+                if postings:
+                    self._write_segment(conn, postings)
+            self._invalidate()
+
+            if conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0] > MAX_SEGMENTS:
+                self.compact()
+        return counts
+
+    def compact(self) -> None:
+        """Merge all segments into one, dropping the postings of dead documents."""
+        with self._lock:
+            conn = self._connect()
+            live, _ = self._document_arrays()
+            old_segments = [row[0] for row in conn.execute("SELECT segment_id FROM segments")]
+            postings = defaultdict(list)
+            for term, segment_id, offset, count in conn.execute("SELECT term, segment_id, offset, count FROM terms"):
+                chunk = self._segment_postings(segment_id)[offset:offset + count]
+                chunk = chunk[live[chunk["doc"]]]
+                postings[term].extend(zip(chunk["doc"].tolist(), chunk["tf"].tolist()))
+            postings = {term: values for term, values in postings.items() if values}
+            with conn:
+                conn.execute("DELETE FROM terms")
+                conn.execute("DELETE FROM segments")
+                conn.execute("DELETE FROM documents WHERE NOT live")
+                if postings:
+                    self._write_segment(conn, postings)
+            self._invalidate()
+            for segment_id in old_segments:
+                self._segment_path(segment_id).unlink(missing_ok=True)
+
+    def search(self, query: str, max_results: int = 5, include_raw_content: bool = True) -> Dict[str, Any]:
+        """Search the index with BM25 and return a response in the Tavily format.
+
+        Scores are scaled to 0-1 relative to the best match. The snippet (`content`) is
+        the passage of the document that best matches the query, and `raw_content` the
+        whole document text, read back from the corpus.
+        """
+        terms = set(normalize_query_terms(query))
+        with self._lock:
+            conn = self._connect()
+            live, lengths = self._document_arrays()
+            live_count = int(live.sum())
+            scores = np.zeros(len(live))
+            if live_count and terms:
+                average_length = float(lengths[live].mean()) or 1.0
+                placeholders = ",".join("?" * len(terms))
+                by_term = defaultdict(list)
+                for term, segment_id, offset, count in conn.execute(
+                    f"SELECT term, segment_id, offset, count FROM terms WHERE term IN ({placeholders})", list(terms)
+                ):
+                    by_term[term].append(self._segment_postings(segment_id)[offset:offset + count])
+                for chunks in by_term.values():
+                    postings = np.concatenate(chunks)
+                    postings = postings[live[postings["doc"]]]
+                    if not len(postings):
+                        continue
+                    idf = math.log(1 + (live_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    docs = postings["doc"].astype(np.int64)
+                    tf = postings["tf"].astype(np.float64)
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / average_length)
+                    np.add.at(scores, docs, idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+            count = min(max_results, int((scores > 0).sum()))
+            top = np.argpartition(-scores, count - 1)[:count] if count else np.array([], dtype=np.int64)
+            top = top[np.argsort(-scores[top])]
+            rows = {
+                doc_id: (path, url, title)
+                for doc_id, path, url, title in conn.execute(
+                    f"SELECT doc_id, path, url, title FROM documents WHERE doc_id IN ({','.join('?' * len(top))})",
+                    [int(doc_id) for doc_id in top]
+                )
+            } if count else {}
+
+        results = []
+        for doc_id in top:
+            path, url, title = rows[int(doc_id)]
+            try:
+                _, _, text = load_document(Path(path))
+            except (OSError, ValueError):
+                continue
+            results.append({
+                "title": title,
+                "url": url,
+                "content": self._snippet(text, query),
+                "score": round(float(scores[doc_id] / scores[top[0]]), 4),
+                "raw_content": text if include_raw_content else None
+            })
+        return {"query": query, "follow_up_questions": None, "answer": None, "images": [], "results": results}
+
+    def fetch(self, urls: List[str]) -> Dict[str, str]:
+        """Return the text of the indexed documents with these URLs, read back from the corpus."""
+        if not urls:
+            return {}
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT url, path FROM documents WHERE live AND url IN ({','.join('?' * len(urls))})", list(urls)
+            ).fetchall()
+        pages = {}
+        for url, path in rows:
+            try:
+                _, _, pages[url] = load_document(Path(path))
+            except (OSError, ValueError):
+                continue
+        return pages
+
+    @staticmethod
+    def _snippet(text: str, query: str) -> str:
+        passages = split_passages(text) or [text]
+        scores = bm25_scores(passages, normalize_query_terms(query))
+        best = max(range(len(passages)), key=lambda i: scores[i]) if scores else 0
+        snippet = passages[best]
+        return snippet if len(snippet) <= SNIPPET_CHARS else snippet[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+
+    def close(self) -> None:
+        with self._lock:
+            self._invalidate()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_local_index: Optional[LocalIndex] = None
+
+def get_local_index() -> LocalIndex:
+    """Return the process-wide local index, brought up to date with LOCAL_SEARCH_DIR on first use."""
+    global _local_index
+    if _local_index is None:
+        index = LocalIndex(LOCAL_INDEX_DIR)
+        if LOCAL_SEARCH_DIR:
+            index.update(LOCAL_SEARCH_DIR)
+        _local_index = index
+    return _local_index
+
+def main():
+    # Build or refresh the index ahead of a run
+    parser = argparse.ArgumentParser(description="Build or refresh the local search index")
+    parser.add_argument("docs_dir", help="Directory of documents to index")
+    parser.add_argument("--compact", action="store_true", help="Merge the segments and drop deleted documents after the update")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+
+    index = LocalIndex(LOCAL_INDEX_DIR)
+    counts = index.update(args.docs_dir)
+    logging.getLogger(__name__).info(
+        "Indexed %s into %s: %d added, %d updated, %d removed",
+        args.docs_dir, LOCAL_INDEX_DIR, counts["added"], counts["updated"], counts["removed"]
+    )
+    if args.compact:
+        index.compact()
+
+if __name__ == "__main__":
+    main()
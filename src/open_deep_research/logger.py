@@ -1,5 +1,6 @@
 import os
 import json
+from dataclasses import dataclass, fields
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 from pathlib import Path
@@ -7,6 +8,17 @@ from pathlib import Path
 # Hardcoded path for logs
 LOGS_DIR = "/Users/eligottlieb/Documents/open_deep_research/src/open_deep_research/logs"
 
+@dataclass
+class MetricCounters:
+    """Base class for performance counters that can be reported with `log_metrics`."""
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def reset(self) -> None:
+        for f in fields(self):
+            setattr(self, f.name, f.default)
+
 class NewsletterLogger:
     """A simplified logging system for the newsletter generation process that focuses on LLM interactions."""
     
@@ -126,6 +138,26 @@ class NewsletterLogger:
         }
         self._write_log_entry(entry)
     
+    def log_metrics(self,
+                    name: str,
+                    metrics: Dict[str, Any],
+                    context: Optional[str] = None) -> None:
+        """Log a snapshot of performance counters (cache hits, saved calls, ...)."""
+        # Print a single summary line
+        context_info = f" ({context})" if context else ""
+        summary = ", ".join(f"{key}={value}" for key, value in metrics.items())
+        print(f"\n[METRICS: {name}]{context_info} {summary}")
+        
+        # Log to file
+        entry = {
+            "type": "metrics",
+            "timestamp": self._get_timestamp(),
+            "name": name,
+            "context": context,
+            "metrics": metrics
+        }
+        self._write_log_entry(entry)
+    
     def log_state_update(self, 
                         state_name: str,
                         state_data: Dict[str, Any],
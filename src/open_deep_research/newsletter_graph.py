@@ -1,31 +1,31 @@
-from typing import Literal
+import functools
+from typing import Literal, Optional
 
-from langchain_anthropic import ChatAnthropic 
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
 
 from langgraph.constants import Send
 from langgraph.graph import START, END, StateGraph
 from langgraph.types import interrupt, Command
 
-from langchain_community.tools import TavilySearchResults
 from langgraph.prebuilt import ToolNode
-from langchain_community.tools.pubmed.tool import PubmedQueryRun
-from langchain.agents import load_tools
 
 
 from src.open_deep_research.newsletter_state import (
     NewsletterStateInput, NewsletterStateOutput, NewsletterState, 
     ResearchBlockState, ResearchBlockOutputState, ExecutionPlan, 
-    ReconsiderationBlock, Status, ResearchBlock, TemplateBuilderItem, 
+    ReconsiderationBlock, Status, ResearchBlock, 
     ReportDraft, SchemaAdapter, openai_compatible, Queries, Feedback, BlockType
 )
-from src.open_deep_research.newsletter_prompts import template_builder_instructions, query_writer_instructions, section_writer_instructions, section_grader_instructions, initial_execution_plan_creation, execution_block_creation_instructions, research_system_prompt_creation, summary_system_prompt
+from src.open_deep_research.newsletter_prompts import template_builder_instructions, query_writer_instructions, section_writer_instructions, section_grader_instructions, initial_execution_plan_creation, execution_block_creation_instructions, research_system_prompt_creation, research_task_prompt, summary_system_prompt
 from src.open_deep_research.configuration import Configuration
-from src.open_deep_research.utils import tavily_search_async, deduplicate_and_format_sources, format_sections, perplexity_search
+from src.open_deep_research.utils import deduplicate_and_format_sources, format_sections, format_completed_items, collapse_queries, reset_search_metrics
+from src.open_deep_research.search_backends import get_search_backend, search_with_lazy_raw_content, stream_search_and_format
 from src.open_deep_research.logger import NewsletterLogger
+from src.open_deep_research.blob_store import store_text, resolve_text, resolve_messages
+from src.open_deep_research.clients import get_writer_model, get_planner_model, get_research_tools, get_model_with_tools
+from src.open_deep_research.prompt_cache import cached_system_message, with_conversation_breakpoint, message_text
+from src.open_deep_research.token_stream import generate_streamed
 
 
 # Create a custom tool node that logs tool usage
@@ -33,15 +33,20 @@ class LoggingToolNode(ToolNode):
     """A wrapper around ToolNode that logs tool calls and responses"""
     
     def invoke(self, state, config=None):
+        result = super().invoke(state, config)
+        return self._after_tool_calls(state, config, result)
+
+    async def ainvoke(self, state, config=None, **kwargs):
+        result = await super().ainvoke(state, config, **kwargs)
+        return self._after_tool_calls(state, config, result)
+
+    def _after_tool_calls(self, state, config, result):
         # Extract the tool call from the state
         tool_calls = []
         for message in state.get("messages", []):
             if hasattr(message, "tool_calls") and message.tool_calls:
                 tool_calls.extend(message.tool_calls)
         
-        # Call the original tool node
-        result = super().invoke(state, config)
-        
         # Log the tool responses
         logger = NewsletterLogger.get_current_logger()
         if logger and tool_calls:
@@ -73,42 +78,35 @@ class LoggingToolNode(ToolNode):
                         # If logging fails, log the error but don't crash
                         if logger:
                             logger.log_error(e, f"Error logging tool execution: {str(tool_call)}")
+
+        # Keep large tool outputs out of the graph state; call_model resolves them
+        if Configuration.from_runnable_config(config).store_large_text_as_blobs:
+            for message in result.get("messages", []):
+                message.content = store_text(message.content)
         
         return result
 
 import json
-# Set writer model
-writer_model = ChatAnthropic(model=Configuration.writer_model, temperature=0) 
-planner_model = ChatOpenAI(model=Configuration.planner_model)
-# TOOLS
-tavily_tool = TavilySearchResults(
-    max_results=3,
-    search_depth="advanced",
-    include_answer=True,
-    include_raw_content=True,
-    include_images=False,
-    # include_domains=[...],
-    # exclude_domains=[...],
-    # name="...",            # overwrite default tool name
-    # description="...",     # overwrite default tool description
-    # args_schema=...,       # overwrite default args_schema: BaseModel
-)
-tools = [tavily_tool, PubmedQueryRun()] + load_tools(
-    ["arxiv"],
-)
-# Replace standard ToolNode with our logging version
-tool_node = LoggingToolNode(tools)
 
-model_with_tools = ChatAnthropic(model=Configuration.writer_model, temperature=0).bind_tools(tools)
+@functools.cache
+def get_tool_node() -> LoggingToolNode:
+    """The research agent's tool node, created on first use like the tools it runs."""
+    return LoggingToolNode(list(get_research_tools()))
 
+async def run_tools(state: ResearchBlockState, config: RunnableConfig):
+    """ Run the tool calls of the last agent message """
+    return await get_tool_node().ainvoke(state, config)
 
 # Nodes
-def entry_worker(state: NewsletterState, config: RunnableConfig):
+async def entry_worker(state: NewsletterState, config: RunnableConfig):
     """ Entry worker that creates the initial execution plan item """
     
     # Initialize a new logger for this run with hardcoded path
     logger = NewsletterLogger.initialize_new_logger()
 
+    # Start the run with fresh search counters
+    reset_search_metrics()
+
     # Retrieve the newsletter metadata
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
@@ -123,7 +121,7 @@ def entry_worker(state: NewsletterState, config: RunnableConfig):
     )
 
     # Generate the initial execution plan
-    response = planner_model.invoke([
+    response = await get_planner_model().ainvoke([
         SystemMessage(content=initial_execution_plan_creation_prompt),
         HumanMessage(content="Create the execution plan.")
     ])
@@ -159,14 +157,25 @@ def entry_worker(state: NewsletterState, config: RunnableConfig):
 
     return {"execution_plan": initial_execution_plan, "initial_execution_plan": response.content, "newsletter_metadata": newsletter_metadata}
 
+def _execution_plan_messages(system_instructions: str):
+    return [
+        SystemMessage(content=system_instructions),
+        HumanMessage(content="Generate or revise the execution plan based on the current state.")
+    ]
+
 @openai_compatible
 def generate_execution_plan(system_instructions: str) -> ExecutionPlan:
+    """Synchronous version of `generate_execution_plan_async`, calling the model's sync client"""
+    response = get_planner_model().invoke(_execution_plan_messages(system_instructions))
+    return _parse_execution_plan(system_instructions, response)
+
+@openai_compatible
+async def generate_execution_plan_async(system_instructions: str) -> ExecutionPlan:
     """Helper function to generate execution plan using OpenAI"""
-    response = planner_model.invoke([
-        SystemMessage(content=system_instructions),
-        HumanMessage(content="Generate or revise the execution plan based on the current state.")
-    ])
-    
+    response = await get_planner_model().ainvoke(_execution_plan_messages(system_instructions))
+    return _parse_execution_plan(system_instructions, response)
+
+def _parse_execution_plan(system_instructions: str, response) -> ExecutionPlan:
     # Get the current logger instance
     logger = NewsletterLogger.get_current_logger()
     if logger:
@@ -180,7 +189,7 @@ def generate_execution_plan(system_instructions: str) -> ExecutionPlan:
     # Parse the content from the AIMessage into our ExecutionPlan model
     return ExecutionPlan.model_validate_json(response.content)
 
-def execution_plan_builder(state: NewsletterState, config: RunnableConfig):
+async def execution_plan_builder(state: NewsletterState, config: RunnableConfig):
     """ Generate or revise the execution plan """
 
     # Get inputs
@@ -206,52 +215,7 @@ def execution_plan_builder(state: NewsletterState, config: RunnableConfig):
 
     # Format completed items with structure appropriate for execution items
     completed_items = state.get("completed_items", [])
-    if not completed_items:
-        completed_items_str = "No completed items yet"
-    else:
-        # Create detailed formatted string for completed items
-        completed_items_parts = []
-        for item in completed_items:
-            item_type = type(item).__name__
-            
-            # Basic info for all types
-            item_info = [
-                f"ID: {item.id}",
-                f"Type: {item_type}",
-                f"Block Type: {item.block_type.value}",
-                f"Description: {item.description}",
-                f"Status: {item.status.value}"
-            ]
-            
-            # Add type-specific fields
-            if isinstance(item, ResearchBlock):
-                item_info.extend([
-                    f"Research Goal: {item.research_goal}",
-                    f"Desired Output: {item.desired_output}",
-                    f"Relevant Context: {item.relevant_context}",
-                    f"Evaluation Criteria: {item.evaluation_criteria if item.evaluation_criteria else 'None'}"
-                ])
-            elif isinstance(item, ReconsiderationBlock):
-                item_info.extend([
-                    f"Reason: {item.reason}",
-                    f"Guiding Questions: {', '.join(item.guiding_questions) if item.guiding_questions else 'None'}",
-                    f"Proposed Changes: {item.proposed_changes if item.proposed_changes else 'None'}"
-                ])
-            elif isinstance(item, TemplateBuilderItem):
-                item_info.extend([
-                    f"Template Goal: {item.template_goal}",
-                    f"Constraints: {item.constraints if item.constraints else 'None'}",
-                    f"Notes: {item.notes if item.notes else 'None'}"
-                ])
-            
-            # Add output for all types
-            item_info.append(f"Output: {item.output if item.output else 'No output generated'}")
-            
-            # Join item info with line breaks and add to parts
-            completed_items_parts.append("\n".join(item_info))
-        
-        # Join all items with clear separation
-        completed_items_str = "\n\n---\n\n".join(completed_items_parts)
+    completed_items_str = format_completed_items(completed_items)
 
     # Generate system prompt using the execution_block_creation_instructions
     system_instructions = execution_block_creation_instructions.format(
@@ -262,7 +226,7 @@ def execution_plan_builder(state: NewsletterState, config: RunnableConfig):
     )
 
     # Generate/revise execution plan using our OpenAI-compatible helper
-    execution_plan = generate_execution_plan(system_instructions)
+    execution_plan = await generate_execution_plan_async(system_instructions)
 
     # Record the outcome in the reconsideration item's output
     plan_reconsideration_item.status = Status.COMPLETED
@@ -319,7 +283,7 @@ def execution_orchestrator(state: NewsletterState, config: RunnableConfig):
     else:
         return Command(goto="template_builder")
     
-def template_builder(state: NewsletterState, config: RunnableConfig):
+async def template_builder(state: NewsletterState, config: RunnableConfig):
     """ Build or update the newsletter template """
 
     # Get the current execution plan and template builder item
@@ -365,7 +329,7 @@ def template_builder(state: NewsletterState, config: RunnableConfig):
         research_outputs = []
         for item in completed_items:
             if isinstance(item, ResearchBlock) and item.status == Status.COMPLETED:
-                research_outputs.append(f"Research: {item.id}\nGoal: {item.research_goal}\nOutput: {item.output}")
+                research_outputs.append(f"Research: {item.id}\nGoal: {item.research_goal}\nOutput: {resolve_text(item.output)}")
         
         if research_outputs:
             new_information = "Research Findings:\n" + "\n\n".join(research_outputs)
@@ -385,7 +349,7 @@ def template_builder(state: NewsletterState, config: RunnableConfig):
         )
 
         # Generate new template using our OpenAI-compatible helper
-        new_draft = generate_report_draft(system_instructions)
+        new_draft = await generate_report_draft_async(system_instructions, block_id=template_builder_item.id)
 
         # Log the template update
         if logger:
@@ -411,14 +375,25 @@ def template_builder(state: NewsletterState, config: RunnableConfig):
             logger.log_error(e, f"Error building template for {template_builder_item.id}")
         raise
 
-@openai_compatible
-def generate_report_draft(system_instructions: str) -> ReportDraft:
-    """Helper function to generate report draft using OpenAI"""
-    response = planner_model.invoke([
+def _report_draft_messages(system_instructions: str):
+    return [
         SystemMessage(content=system_instructions),
         HumanMessage(content="Generate or update the report draft based on the provided information.")
-    ])
-    
+    ]
+
+@openai_compatible
+def generate_report_draft(system_instructions: str) -> ReportDraft:
+    """Synchronous version of `generate_report_draft_async`, calling the model's sync client"""
+    response = get_planner_model().invoke(_report_draft_messages(system_instructions))
+    return _parse_report_draft(system_instructions, response)
+
+@openai_compatible
+async def generate_report_draft_async(system_instructions: str, block_id: Optional[str] = None) -> ReportDraft:
+    """Helper function to generate report draft using OpenAI, streaming the draft's JSON tagged with `block_id` when enabled"""
+    response = await generate_streamed(get_planner_model(), _report_draft_messages(system_instructions), block_id=block_id)
+    return _parse_report_draft(system_instructions, response)
+
+def _parse_report_draft(system_instructions: str, response) -> ReportDraft:
     # Get the current logger instance
     logger = NewsletterLogger.get_current_logger()
     if logger:
@@ -432,7 +407,7 @@ def generate_report_draft(system_instructions: str) -> ReportDraft:
     # Parse the content from the AIMessage into our NewsletterTemplate model
     return ReportDraft.model_validate_json(response.content)
 
-def generate_queries(state: ResearchBlockState, config: RunnableConfig):
+async def generate_queries(state: ResearchBlockState, config: RunnableConfig):
     """ Generate search queries for a report section """
 
     # Get state 
@@ -452,18 +427,29 @@ def generate_queries(state: ResearchBlockState, config: RunnableConfig):
     )
 
     # Generate queries using our OpenAI-compatible helper
-    queries = generate_search_queries(system_instructions)
+    queries = await generate_search_queries_async(system_instructions)
 
     return {"search_queries": queries.queries}
 
+def _search_queries_messages(system_instructions: str):
+    return [
+        SystemMessage(content=system_instructions),
+        HumanMessage(content="Generate search queries that will help accomplish this research goal.")
+    ]
+
 @openai_compatible
 def generate_search_queries(system_instructions: str) -> Queries:
+    """Synchronous version of `generate_search_queries_async`, calling the model's sync client"""
+    response = get_planner_model().invoke(_search_queries_messages(system_instructions))
+    return _parse_search_queries(system_instructions, response)
+
+@openai_compatible
+async def generate_search_queries_async(system_instructions: str) -> Queries:
     """Helper function to generate search queries using OpenAI"""
-    response = planner_model.invoke([
-        SystemMessage(content=system_instructions),
-        HumanMessage(content="Generate search queries that will help accomplish this research goal.")
-    ])
-    
+    response = await get_planner_model().ainvoke(_search_queries_messages(system_instructions))
+    return _parse_search_queries(system_instructions, response)
+
+def _parse_search_queries(system_instructions: str, response) -> Queries:
     # Get the current logger instance
     logger = NewsletterLogger.get_current_logger()
     if logger:
@@ -487,26 +473,22 @@ async def search_web(state: ResearchBlockState, config: RunnableConfig):
     configurable = Configuration.from_runnable_config(config)
 
     # Web search
-    query_list = [query.search_query for query in search_queries]
+    query_list = collapse_queries([query.search_query for query in search_queries], configurable.query_similarity_threshold)
     
-    # Handle both cases for search_api:
-    # 1. When selected in Studio UI -> returns a string (e.g. "tavily")
-    # 2. When using default -> returns an Enum (e.g. SearchAPI.TAVILY)
-    if isinstance(configurable.search_api, str):
-        search_api = configurable.search_api
-    else:
-        search_api = configurable.search_api.value
-
     try:
-        # Search the web
-        if search_api == "tavily":
-            search_results = await tavily_search_async(query_list)
-            source_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=5000, include_raw_content=True)
-        elif search_api == "perplexity":
-            search_results = perplexity_search(query_list)
-            source_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=5000, include_raw_content=False)
+        # Search the web, with full page content when the backend provides it
+        search_backend = get_search_backend(configurable.search_api, configurable.local_search_first, configurable.local_search_min_coverage)
+        include_raw_content = search_backend.capabilities.supports_raw_content
+        lazy_raw_content = include_raw_content and configurable.raw_content_top_k and search_backend.capabilities.supports_lazy_raw_content
+        if configurable.stream_search_results and not lazy_raw_content:
+            source_str, search_results = await stream_search_and_format(search_backend, query_list, max_tokens_per_source=5000, include_raw_content=include_raw_content, token_budget=configurable.source_token_budget, max_concurrency=configurable.max_concurrent_searches, near_duplicate_threshold=configurable.near_duplicate_threshold, extraction=configurable.source_extraction)
         else:
-            raise ValueError(f"Unsupported search API: {configurable.search_api}")
+            if lazy_raw_content:
+                # Snippets for every query first, then full content only for the top-ranked sources
+                search_results = await search_with_lazy_raw_content(search_backend, query_list, configurable.raw_content_top_k, max_concurrency=configurable.max_concurrent_searches)
+            else:
+                search_results = await search_backend.search(query_list, include_raw_content=include_raw_content, max_concurrency=configurable.max_concurrent_searches)
+            source_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=5000, include_raw_content=include_raw_content, near_duplicate_threshold=configurable.near_duplicate_threshold, extraction=configurable.source_extraction, token_budget=configurable.source_token_budget)
 
         # Log the web search
         logger = NewsletterLogger.get_current_logger()
@@ -514,23 +496,23 @@ async def search_web(state: ResearchBlockState, config: RunnableConfig):
             logger.log_web_search(
                 queries=query_list,
                 results=search_results,
-                search_api=search_api
+                search_api=search_backend.name
             )
 
-        return {"source_str": source_str}
+        return {"source_str": store_text(source_str, configurable.store_large_text_as_blobs)}
     except Exception as e:
         # Log any errors during web search
         logger = NewsletterLogger.get_current_logger()
         if logger:
-            logger.log_error(e, f"Error during web search with {search_api}")
+            logger.log_error(e, f"Error during web search with {configurable.search_api}")
         raise
 
-def write_section(state: ResearchBlockState, config: RunnableConfig) -> Command[Literal[END,"search_web"]]:
+async def write_section(state: ResearchBlockState, config: RunnableConfig) -> Command[Literal[END,"search_web"]]:
     """ Write a section of the newsletter based on research findings """
 
     # Get state 
     research_item = state["researchItem"]
-    source_str = state["source_str"]
+    source_str = resolve_text(state["source_str"])
 
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
@@ -542,16 +524,16 @@ def write_section(state: ResearchBlockState, config: RunnableConfig) -> Command[
         relevant_context=research_item.relevant_context or "No additional context provided",
         desired_output=research_item.desired_output or "No specific output format specified",
         evaluation_criteria=research_item.evaluation_criteria or "No specific evaluation criteria provided",
-        current_output=research_item.output or "No existing content",
+        current_output=resolve_text(research_item.output) or "No existing content",
         source_str=source_str
     )
 
     try:
-        # Generate section content
-        section_content = writer_model.invoke([
+        # Generate section content, streaming its tokens when enabled
+        section_content = await generate_streamed(get_writer_model(), [
             SystemMessage(content=system_instructions),
             HumanMessage(content="Write the section content based on the research findings.")
-        ])
+        ], block_id=research_item.id)
 
         # Log the LLM interaction
         logger = NewsletterLogger.get_current_logger()
@@ -581,8 +563,8 @@ def write_section(state: ResearchBlockState, config: RunnableConfig) -> Command[
         )
 
         # Grade the section
-        structured_llm = writer_model.with_structured_output(Feedback)
-        feedback = structured_llm.invoke([
+        structured_llm = get_writer_model().with_structured_output(Feedback)
+        feedback = await structured_llm.ainvoke([
             SystemMessage(content=grader_instructions),
             HumanMessage(content="Evaluate the section content against the research requirements.")
         ])
@@ -635,16 +617,17 @@ def build_research_system_prompt(state: ResearchBlockState):
     research_item = state["researchItem"]
 
     # Get the names of available tools as a comma-separated string
-    tool_names = ", ".join([tool.name for tool in tools])
+    tool_names = ", ".join([tool.name for tool in get_research_tools()])
     
-    # build the system prompt
-    research_system_prompt = research_system_prompt_creation.format(
+    # build the system prompt: the instructions shared by every research block, then the task
+    research_instructions = research_system_prompt_creation.format(tool_names=tool_names)
+    research_task = research_task_prompt.format(
         research_goal=research_item.research_goal,
         desired_output=research_item.desired_output,
         relevant_context=research_item.relevant_context or "No additional context provided",
-        evaluation_criteria=research_item.evaluation_criteria or "No specific evaluation criteria provided",
-        tool_names=tool_names
+        evaluation_criteria=research_item.evaluation_criteria or "No specific evaluation criteria provided"
     )
+    research_system_prompt = research_instructions + research_task
     
     # Log the system prompt creation
     logger = NewsletterLogger.get_current_logger()
@@ -665,8 +648,8 @@ def build_research_system_prompt(state: ResearchBlockState):
             output=f"Starting research task with goal: {research_item.research_goal}\nDesired output: {research_item.desired_output}"
         )
 
-    # Return the system prompt as a message to be sent to the model
-    return {"messages": [SystemMessage(content=research_system_prompt), HumanMessage(content="Please conduct the research.")]}
+    # Return the system prompt as a message to be sent to the model, with a cache breakpoint after each part
+    return {"messages": [cached_system_message(research_instructions, research_task), HumanMessage(content="Please conduct the research.")]}
 
 
 def should_continue(state: ResearchBlockState):
@@ -677,9 +660,11 @@ def should_continue(state: ResearchBlockState):
     return "end"
 
 
-def call_model(state: ResearchBlockState):
-    messages = state["messages"]
-    response = model_with_tools.invoke(messages)
+async def call_model(state: ResearchBlockState):
+    messages = resolve_messages(state["messages"])
+    response = await get_model_with_tools("anthropic", Configuration.writer_model, temperature=0).ainvoke(
+        with_conversation_breakpoint(messages)
+    )
     
     # Log the model interaction and any tool calls
     logger = NewsletterLogger.get_current_logger()
@@ -722,14 +707,14 @@ def call_model(state: ResearchBlockState):
     return {"messages": [response]}
 
 
-def end_node(state: ResearchBlockState):
+async def end_node(state: ResearchBlockState, config: RunnableConfig):
     # retreive the research block
     research_item = state["researchItem"]
-    messages = state["messages"]
+    messages = resolve_messages(state["messages"])
     
     # Extract relevant information from messages for summarization
     conversation_context = "\n\n".join([
-        f"{msg.type}: {msg.content}" 
+        f"{msg.type}: {message_text(msg)}" 
         for msg in messages 
         if hasattr(msg, "content") and msg.content
     ])
@@ -742,11 +727,11 @@ def end_node(state: ResearchBlockState):
         conversation_context=conversation_context
     )
 
-    # Generate the summary
-    summary = writer_model.invoke([
+    # Generate the summary, streaming its tokens when enabled
+    summary = await generate_streamed(get_writer_model(), [
         SystemMessage(content=summary_system_prompt_final),
         HumanMessage(content="Please summarize the research findings.")
-    ])
+    ], block_id=research_item.id)
 
     # Log the summary generation
     logger = NewsletterLogger.get_current_logger()
@@ -758,7 +743,8 @@ def end_node(state: ResearchBlockState):
         )
 
     # Update the research item with the summary and mark as completed
-    research_item.output = summary.content
+    configurable = Configuration.from_runnable_config(config)
+    research_item.output = store_text(summary.content, configurable.store_large_text_as_blobs)
     research_item.status = Status.COMPLETED
     
     # Log the completed research item
@@ -768,7 +754,7 @@ def end_node(state: ResearchBlockState):
             item_id=research_item.id,
             description=research_item.description,
             status=research_item.status.value,
-            output=research_item.output
+            output=summary.content
         )
 
     # Return the completed research item
@@ -788,7 +774,7 @@ def check_done(state: NewsletterState):
 research_worker = StateGraph(ResearchBlockState, output=ResearchBlockOutputState)
 research_worker.add_node("generate_context_prompt", build_research_system_prompt)
 research_worker.add_node("agent", call_model)
-research_worker.add_node("tools", tool_node)
+research_worker.add_node("tools", run_tools)
 research_worker.add_node("end", end_node)
 
 # Add edges
@@ -87,7 +87,9 @@ Write in a direct, instructional voice using active language. Your plan should r
 Now create a comprehensive execution plan based on the provided newsletter metadata. The plan should enable autonomous generation of a high-quality newsletter that fully embodies the publication's established identity and purpose. Focus exclusively on the research, writing, and content refinement process ending with the final content ready for delivery.
 """
 
-execution_block_creation_instructions = """You are an expert workflow planner tasked with advancing a modular newsletter production process. You have the following inputs:
+# The static instructions come first and the inputs last, so consecutive calls share a long
+# prompt prefix that the provider can cache; the inputs are ordered from most to least stable
+execution_block_creation_instructions = """You are an expert workflow planner tasked with advancing a modular newsletter production process. You have the following inputs, given at the end of this prompt:
 	1.	Initial Execution Plan: A comprehensive, step-by-step plan outlining the creation of a newsletter.
 	2.	Completed Execution Blocks: A list of research, template building, and reconsideration blocks that have already been executed (each with their outputs).
 	3.	Recent Reconsideration Block: A block that was just completed, indicating a checkpoint where the current outputs were evaluated and new steps are needed.
@@ -105,23 +107,6 @@ Generate the new execution blocks in valid JSON format, ensuring that:
 	•	Every block is immediately executable (i.e., does not depend on outputs that are not yet available).
 	•	The final item in the list is always a reconsideration block.
 
-<Initial Execution Plan>
-{initial_execution_plan}
-</Initial Execution Plan>
-
-<Completed Items>
-{completed_items}
-</Completed Items>
-
-<Recent Reconsideration Block>
-{recent_reconsideration_block}
-</Recent Reconsideration Block>
-
-For reference, here is the newsletter metadata:
-<Newsletter Metadata>
-{newsletter_metadata}
-</Newsletter Metadata>
-
 <Output Format>
 You must return a valid ExecutionPlan object with items in this exact structure:
 
@@ -184,6 +169,23 @@ Important Requirements:
    - Any remaining issues are minor refinements that can be addressed in final editing
 ENSURE THE "done" FIELD IS PRESENT IN YOUR OUTPUT!
 </Output Format>
+
+For reference, here is the newsletter metadata:
+<Newsletter Metadata>
+{newsletter_metadata}
+</Newsletter Metadata>
+
+<Initial Execution Plan>
+{initial_execution_plan}
+</Initial Execution Plan>
+
+<Completed Items>
+{completed_items}
+</Completed Items>
+
+<Recent Reconsideration Block>
+{recent_reconsideration_block}
+</Recent Reconsideration Block>
 """
 
 
@@ -421,32 +423,8 @@ For Conclusion/Summary:
 - Do not include word count or any preamble in your response
 </Quality Checks>"""
 
-# Prompt for updating the newsletter template based on new information
-template_builder_instructions = """You are an expert newsletter architect, tasked with evolving the newsletter draft based on detailed metadata and new research information.
-
-<Newsletter Metadata>
-{newsletter_metadata}
-</Newsletter Metadata>
-
-<Current Draft>
-{current_draft}
-</Current Draft>
-
-<Template Building Task>
-{template_goal}
-</Template Building Task>
-
-<Constraints>
-{constraints}
-</Constraints>
-
-<New Information>
-{new_information}
-</New Information>
-
-<Additional Notes>
-{notes}
-</Aditional Notes>
+# Prompt for updating the newsletter template based on new information (static part first, as above)
+template_builder_instructions = """You are an expert newsletter architect, tasked with evolving the newsletter draft based on detailed metadata and new research information, all given at the end of this prompt.
 
 <Task>
 Your goal is to create or update a newsletter draft that fully embodies the newsletter's purpose, tone, and target audience as specified in the metadata. Integrate any new research findings to enrich the content while maintaining coherence and focus.
@@ -522,26 +500,40 @@ The level of detail and completeness should evolve based on available informatio
 - Advanced drafts: Refine language, improve flow, and enhance overall cohesion
 
 Apply your expertise to create the most compelling and effective newsletter draft possible given the available information and constraints.
-</Output Format>"""
+</Output Format>
 
-# Define the research system prompt template
-research_system_prompt_creation = """
-# Research Agent Instructions
+<Newsletter Metadata>
+{newsletter_metadata}
+</Newsletter Metadata>
 
-## Your Role
-You are an expert research agent for newsletter content creation. Your goal is to conduct thorough research on a specific topic and produce high-quality, accurate content that will be used in a newsletter.
+<Template Building Task>
+{template_goal}
+</Template Building Task>
 
-## Research Goal
-{research_goal}
+<Constraints>
+{constraints}
+</Constraints>
 
-## Desired Output Format
-{desired_output}
+<Additional Notes>
+{notes}
+</Additional Notes>
 
-## Relevant Context
-{relevant_context}
+<Current Draft>
+{current_draft}
+</Current Draft>
 
-## Evaluation Criteria
-{evaluation_criteria}
+<New Information>
+{new_information}
+</New Information>"""
+
+# Define the research system prompt template. It is split in two system prompt blocks: the
+# instructions, identical for every research block, and the task of the block. Both are
+# cached by the provider, so tool rounds only pay for the new messages
+research_system_prompt_creation = """
+# Research Agent Instructions
+
+## Your Role
+You are an expert research agent for newsletter content creation. Your goal is to conduct thorough research on a specific topic and produce high-quality, accurate content that will be used in a newsletter. Your research task is described after these instructions.
 
 ## Available Tools
 You have access to the following tools to help with your research:
@@ -568,6 +560,22 @@ You have access to the following tools to help with your research:
 When you have completed your research, summarize your findings according to the desired output format. Your final output should fully satisfy the research goal and meet all evaluation criteria.
 """
 
+research_task_prompt = """
+# Research Task
+
+## Research Goal
+{research_goal}
+
+## Desired Output Format
+{desired_output}
+
+## Relevant Context
+{relevant_context}
+
+## Evaluation Criteria
+{evaluation_criteria}
+"""
+
 # Build the system prompt for summarization
 summary_system_prompt = """
 You are tasked with summarizing research findings based on a conversation with a research agent.
@@ -120,23 +120,36 @@ class SchemaAdapter:
 def openai_compatible(func: Callable[P, R]) -> Callable[P, R]:
     """
     Decorator to make a function that returns a Pydantic model OpenAI-compatible
+
+    Works for both regular and async functions.
     """
-    @wraps(func)
-    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+    def get_return_type() -> Type[BaseModel]:
         # Get the return type annotation
         return_type = get_type_hints(func).get('return')
         if not return_type or not issubclass(return_type, BaseModel):
             raise ValueError("Function must return a Pydantic model")
         
         # Create OpenAI-compatible model
-        openai_model = SchemaAdapter.create_openai_compatible_model(return_type)
-        
-        # Call the original function
-        result = func(*args, **kwargs)
-        
+        SchemaAdapter.create_openai_compatible_model(return_type)
+        return return_type
+
+    def make_compatible(result: BaseModel, return_type: Type[BaseModel]) -> BaseModel:
         # Convert to OpenAI schema and back to ensure compatibility
         openai_data = SchemaAdapter.to_openai_schema(result)
         return SchemaAdapter.from_openai_schema(openai_data, return_type)
+
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            return_type = get_return_type()
+            return make_compatible(await func(*args, **kwargs), return_type)
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        return_type = get_return_type()
+        return make_compatible(func(*args, **kwargs), return_type)
     
     return wrapper
 
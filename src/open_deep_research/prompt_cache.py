@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import LLMResult
+
+from src.open_deep_research.llm_cache import CACHE_HIT_KEY
+from src.open_deep_research.logger import MetricCounters, NewsletterLogger
+
+# Provider-side prompt caching. OpenAI caches the longest prompt prefix it has seen
+# recently on its own (from 1024 tokens), so its prompts only need their static part
+# first. Anthropic caches up to explicit `cache_control` breakpoints, set here on
+# content blocks; a prefix shorter than the model's minimum is simply not cached.
+CACHE_BREAKPOINT = {"type": "ephemeral"}
+
+def _cached_blocks(content: Any) -> List[Dict[str, Any]]:
+    """Return `content` as content blocks with a cache breakpoint after the last one."""
+    blocks = [{"type": "text", "text": content}] if isinstance(content, str) else [dict(block) for block in content]
+    blocks[-1]["cache_control"] = CACHE_BREAKPOINT
+    return blocks
+
+def cached_system_message(*parts: str) -> SystemMessage:
+    """Build a system message from parts ordered from most to least stable, with an
+    Anthropic cache breakpoint after each part.
+
+    A call then reuses the cache of the longest part prefix shared with an earlier
+    call, e.g. the instructions common to every research block, and the full system
+    prompt on the later rounds of the same block.
+    """
+    return SystemMessage(content=[block for part in parts if part for block in _cached_blocks(part)])
+
+def with_conversation_breakpoint(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """Return `messages` with an Anthropic cache breakpoint on the last message, for
+    agent loops: each round then reads the conversation the previous round cached.
+    Only human and tool messages get one; the state keeps the messages unchanged.
+    """
+    if not messages or not isinstance(messages[-1], (HumanMessage, ToolMessage)) or not messages[-1].content:
+        return messages
+    last = messages[-1]
+    return messages[:-1] + [last.model_copy(update={"content": _cached_blocks(last.content)})]
+
+def message_text(message: BaseMessage) -> str:
+    """The text of a message whose content may be a list of content blocks."""
+    return message.content if isinstance(message.content, str) else message.text()
+
+@dataclass
+class PromptCacheStats(MetricCounters):
+    """Prompt tokens of the LLM calls of a run, and how many the provider served from its cache."""
+    calls: int = 0
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = super().as_dict()
+        stats["cached_share"] = round(self.cache_read_tokens / self.input_tokens, 3) if self.input_tokens else 0.0
+        return stats
+
+class PromptCacheUsageHandler(BaseCallbackHandler):
+    """Callback handler that logs the cached prompt tokens of every chat model call.
+
+    The counts come from the response's `usage_metadata` (`cache_read` and, for
+    Anthropic, `cache_creation`) and are logged as "prompt_cache" metrics with the
+    graph node making the call as context. Run totals are kept in `stats`; hits of
+    the LLM response cache (llm_cache.py) are not counted.
+    """
+
+    def __init__(self):
+        self.stats = PromptCacheStats()
+        self._nodes: Dict[UUID, str] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._nodes[run_id] = (metadata or {}).get("langgraph_node", "no_node")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._nodes.pop(run_id, None)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        node = self._nodes.pop(run_id, "no_node")
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                # Completions served by the LLM response cache made no provider call
+                if usage and not message.response_metadata.get(CACHE_HIT_KEY):
+                    self._record(usage, node)
+
+    def _record(self, usage: Dict[str, Any], node: str) -> None:
+        details = usage.get("input_token_details") or {}
+        call = {
+            "input_tokens": usage.get("input_tokens", 0),
+            "cache_read_tokens": details.get("cache_read") or 0,
+            "cache_creation_tokens": details.get("cache_creation") or 0,
+        }
+        self.stats.calls += 1
+        self.stats.input_tokens += call["input_tokens"]
+        self.stats.cache_read_tokens += call["cache_read_tokens"]
+        self.stats.cache_creation_tokens += call["cache_creation_tokens"]
+
+        logger = NewsletterLogger.get_current_logger()
+        if logger:
+            logger.log_metrics("prompt_cache", {**call, "run_totals": self.stats.as_dict()}, context=node)
+
+_usage_handler: Optional[PromptCacheUsageHandler] = None
+
+def get_prompt_cache_handler() -> PromptCacheUsageHandler:
+    """Return the process-wide prompt cache usage handler, attached to every chat model."""
+    global _usage_handler
+    if _usage_handler is None:
+        _usage_handler = PromptCacheUsageHandler()
+    return _usage_handler
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_community.utilities.pubmed import PubMedAPIWrapper
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.tools import BaseTool
+
+from src.open_deep_research.cache import get_tool_cache, search_cache_key
+from src.open_deep_research.logger import NewsletterLogger
+
+RESEARCH_TOOL_WORKERS = int(os.environ.get("RESEARCH_TOOL_WORKERS", 4)) # Blocking tool calls running at once across the process
+# The stock tools report failures as a "<Tool> exception: ..." result instead of raising
+TOOL_ERROR_PATTERN = re.compile(r"^\w+ (exception|error):", re.IGNORECASE)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(RESEARCH_TOOL_WORKERS)
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Return the process-wide thread pool that runs the blocking research tools."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RESEARCH_TOOL_WORKERS, thread_name_prefix="research-tool")
+    return _executor
+
+class BatchedPubMedAPIWrapper(PubMedAPIWrapper):
+    """PubMed wrapper that fetches all articles of a search in one efetch request.
+
+    The stock wrapper issues one efetch call per ID returned by esearch, which means
+    `top_k_results` sequential round trips (and as many chances to hit NCBI's rate
+    limit). efetch accepts a comma separated ID list, so the whole page is fetched at
+    once and the articles are parsed with the stock per-article parser.
+    """
+
+    def lazy_load(self, query: str) -> Iterator[dict]:
+        url = (
+            self.base_url_esearch
+            + "db=pubmed&term="
+            + urllib.parse.quote(query)
+            + f"&retmode=json&retmax={self.top_k_results}&usehistory=y"
+        )
+        if self.api_key != "":
+            url += f"&api_key={self.api_key}"
+        search = json.loads(self._urlopen(url))["esearchresult"]
+
+        uids = search["idlist"]
+        if not uids:
+            return
+        yield from self.retrieve_articles(uids, search["webenv"])
+
+    def retrieve_articles(self, uids: List[str], webenv: str) -> List[dict]:
+        """Fetch and parse several articles with a single efetch request, in the order of `uids`."""
+        url = (
+            self.base_url_efetch
+            + "db=pubmed&retmode=xml&id="
+            + ",".join(uids)
+            + "&webenv="
+            + webenv
+        )
+        if self.api_key != "":
+            url += f"&api_key={self.api_key}"
+        article_set = self.parse(self._urlopen(url)).get("PubmedArticleSet") or {}
+
+        articles = {}
+        for key in ("PubmedArticle", "PubmedBookArticle"):
+            entries = article_set.get(key, [])
+            # xmltodict returns a dict for a single element and a list for several
+            for entry in entries if isinstance(entries, list) else [entries]:
+                uid = _pubmed_uid(entry)
+                articles[uid] = self._parse_article(uid, {"PubmedArticleSet": {key: entry}})
+        return [articles[uid] for uid in uids if uid in articles]
+
+    def _urlopen(self, url: str) -> str:
+        """GET `url`, backing off exponentially on 429 responses."""
+        sleep_time = self.sleep_time
+        for retry in range(self.max_retry + 1):
+            try:
+                with urllib.request.urlopen(url) as response:
+                    return response.read().decode("utf-8")
+            except urllib.error.HTTPError as e:
+                if e.code != 429 or retry == self.max_retry:
+                    raise
+                time.sleep(sleep_time)
+                sleep_time *= 2
+
+def _pubmed_uid(entry: Dict[str, Any]) -> str:
+    citation = entry.get("MedlineCitation") or entry.get("BookDocument") or {}
+    pmid = citation.get("PMID", "")
+    return pmid.get("#text", "") if isinstance(pmid, dict) else str(pmid)
+
+class CachedResearchTool(BaseTool):
+    """Wraps a blocking research tool with a result cache and a bounded thread pool.
+
+    Results are cached by tool name and normalized query (case and whitespace
+    insensitive) in the tool cache, whose TTL is set by TOOL_CACHE_TTL. Error strings
+    returned by the wrapped tool are not cached. The async path runs the wrapped tool
+    on a shared pool of RESEARCH_TOOL_WORKERS threads so a batch of tool calls overlaps
+    instead of running one after another; the sync path is limited to the same number
+    of concurrent calls.
+    """
+
+    tool: BaseTool
+
+    def __init__(self, tool: BaseTool, **kwargs: Any):
+        super().__init__(
+            tool=tool,
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            **kwargs
+        )
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        cache = get_tool_cache()
+        key = search_cache_key(self.name, query, {})
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                self._log_cache_stats(cache)
+                return cached
+
+        with _slots:
+            result = self.tool.invoke({"query": query})
+
+        if cache is not None:
+            if isinstance(result, str) and not _is_error(result):
+                cache.set(key, result)
+            self._log_cache_stats(cache)
+        return result
+
+    async def _arun(self, query: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_tool_executor(), self._run, query)
+
+    def _log_cache_stats(self, cache) -> None:
+        logger = NewsletterLogger.get_current_logger()
+        if logger:
+            logger.log_metrics("tool_cache", cache.stats.as_dict(), context=self.name)
+
+def _is_error(result: str) -> bool:
+    return TOOL_ERROR_PATTERN.match(result) is not None
+
+def cached_tools(tools: List[BaseTool]) -> List[BaseTool]:
+    """Wrap each tool with `CachedResearchTool`."""
+    return [CachedResearchTool(tool) for tool in tools]
@@ -0,0 +1,396 @@
+import asyncio
+import heapq
+from dataclasses import dataclass, replace
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    runtime_checkable,
+)
+
+from src.open_deep_research.configuration import SearchAPI
+from src.open_deep_research.local_index import get_local_index, term_coverage
+from src.open_deep_research.logger import MetricCounters, NewsletterLogger
+from src.open_deep_research.state import SearchResponse
+from src.open_deep_research.text_processing import cluster_queries
+from src.open_deep_research.utils import (
+    SourceFormatter,
+    canonicalize_url,
+    perplexity_search_async,
+    tavily_extract_async,
+    tavily_search_async,
+)
+
+
+@dataclass(frozen=True)
+class BackendCapabilities:
+    """What a search backend can do, so callers can adapt instead of special-casing providers."""
+    supports_async: bool = True # Searches run natively on the event loop
+    supports_batching: bool = True # A batch of queries is searched concurrently
+    supports_raw_content: bool = False # Results can carry the full page content
+    supports_lazy_raw_content: bool = False # Full page content can be fetched later by URL with `fetch_raw_content`
+
+@runtime_checkable
+class SearchBackend(Protocol):
+    """A search provider usable by every search node."""
+    name: str
+    capabilities: BackendCapabilities
+
+    async def search(self,
+                     queries: List[str],
+                     *,
+                     include_raw_content: bool = True,
+                     max_concurrency: int = 5) -> List[SearchResponse]:
+        """Search for every query and return one response per query, in order."""
+        ...
+
+class SyncSearchBackend:
+    """Base class for backends with a blocking client; searches run in a worker thread."""
+    name: str
+    capabilities = BackendCapabilities(supports_async=False, supports_batching=False)
+
+    def search_sync(self, queries: List[str], *, include_raw_content: bool = True) -> List[SearchResponse]:
+        raise NotImplementedError
+
+    async def search(self,
+                     queries: List[str],
+                     *,
+                     include_raw_content: bool = True,
+                     max_concurrency: int = 5) -> List[SearchResponse]:
+        return await asyncio.to_thread(self.search_sync, queries, include_raw_content=include_raw_content)
+
+_search_backends: Dict[SearchAPI, SearchBackend] = {}
+
+def register_search_backend(search_api: SearchAPI) -> Callable[[Type], Type]:
+    """Class decorator registering a backend instance for a `SearchAPI` value."""
+    def decorator(cls: Type) -> Type:
+        _search_backends[search_api] = cls()
+        return cls
+    return decorator
+
+# Local-first wrappers, one per web backend and coverage, so prefetches can match them
+_local_first_backends: Dict[Tuple[SearchAPI, float], "LocalFirstSearchBackend"] = {}
+
+def get_search_backend(search_api: Union[SearchAPI, str],
+                       local_first: bool = False,
+                       local_min_coverage: float = 1.0) -> SearchBackend:
+    """Return the backend registered for `search_api`.
+
+    Handles both cases for search_api:
+    1. When selected in Studio UI -> a string (e.g. "tavily")
+    2. When using default -> an Enum (e.g. SearchAPI.TAVILY)
+
+    With `local_first`, the backend is wrapped to answer queries from the local index
+    first (see `LocalFirstSearchBackend`).
+    """
+    try:
+        search_api = SearchAPI(search_api)
+        search_backend = _search_backends[search_api]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unsupported search API: {search_api}") from None
+    if not local_first or search_api is SearchAPI.LOCAL:
+        return search_backend
+    key = (search_api, float(local_min_coverage))
+    if key not in _local_first_backends:
+        _local_first_backends[key] = LocalFirstSearchBackend(search_backend, min_coverage=key[1])
+    return _local_first_backends[key]
+
+@register_search_backend(SearchAPI.TAVILY)
+class TavilySearchBackend:
+    name = SearchAPI.TAVILY.value
+    capabilities = BackendCapabilities(supports_raw_content=True, supports_lazy_raw_content=True)
+
+    async def search(self, queries, *, include_raw_content=True, max_concurrency=5):
+        search_docs = await tavily_search_async(
+            queries, include_raw_content=include_raw_content, max_concurrency=max_concurrency
+        )
+        return [SearchResponse.from_dict(doc) for doc in search_docs]
+
+    async def fetch_raw_content(self, urls, *, max_concurrency=5):
+        pages = await tavily_extract_async(urls, max_concurrency=max_concurrency)
+        # One page per URL, in order; a cached page may carry a variant of the URL
+        return {url: page["raw_content"] for url, page in zip(urls, pages)}
+
+@register_search_backend(SearchAPI.PERPLEXITY)
+class PerplexitySearchBackend:
+    # Perplexity returns a synthesized answer with citations, not page content
+    name = SearchAPI.PERPLEXITY.value
+    capabilities = BackendCapabilities(supports_raw_content=False)
+
+    async def search(self, queries, *, include_raw_content=True, max_concurrency=5):
+        search_docs = await perplexity_search_async(queries, max_concurrency=max_concurrency)
+        return [SearchResponse.from_dict(doc) for doc in search_docs]
+
+@register_search_backend(SearchAPI.LOCAL)
+class LocalSearchBackend(SyncSearchBackend):
+    # Offline search over a local corpus (see local_index.py), e.g. an archive of fetched pages
+    name = SearchAPI.LOCAL.value
+    capabilities = BackendCapabilities(supports_async=False, supports_batching=False, supports_raw_content=True)
+
+    def search_sync(self, queries, *, include_raw_content=True):
+        index = get_local_index()
+        return [SearchResponse.from_dict(index.search(query, include_raw_content=include_raw_content)) for query in queries]
+
+@dataclass
+class LocalTierStats(MetricCounters):
+    """Counters for the queries of a local-first backend."""
+    local: int = 0 # Queries answered from the local index
+    web: int = 0 # Queries sent to the web backend
+
+class LocalFirstSearchBackend:
+    """Search backend that answers queries from the local index before the web backend.
+
+    Every query is first searched in the local index (see local_index.py). It is answered
+    locally when the best local match contains at least `min_coverage` of the query's
+    terms; only the other queries are sent to the web backend, in one batch. Responses
+    keep the query order. The capabilities are the web backend's: full page content of
+    local results is read back from the corpus, and fetched from the web for the others.
+    """
+
+    def __init__(self, web_backend: SearchBackend, min_coverage: float = 1.0):
+        self.web_backend = web_backend
+        self.min_coverage = min_coverage
+        self.name = web_backend.name
+        self.capabilities = web_backend.capabilities
+        self.stats = LocalTierStats()
+
+    def _search_local(self, queries: List[str], include_raw_content: bool) -> List[Optional[SearchResponse]]:
+        """Local response for each query, or None when the local index cannot answer it."""
+        index = get_local_index()
+        responses = []
+        for query in queries:
+            response = index.search(query, include_raw_content=True)
+            results = response["results"]
+            if not results or term_coverage(query, results[0]["raw_content"]) < self.min_coverage:
+                responses.append(None)
+                continue
+            if not include_raw_content:
+                for result in results:
+                    result["raw_content"] = None
+            responses.append(SearchResponse.from_dict(response))
+        return responses
+
+    async def search(self, queries, *, include_raw_content=True, max_concurrency=5):
+        local = await asyncio.to_thread(self._search_local, queries, include_raw_content)
+        remaining = [query for query, response in zip(queries, local) if response is None]
+        searched = await self.web_backend.search(remaining, include_raw_content=include_raw_content, max_concurrency=max_concurrency) if remaining else []
+
+        self.stats.local += len(queries) - len(remaining)
+        self.stats.web += len(remaining)
+        logger = NewsletterLogger.get_current_logger()
+        if logger:
+            logger.log_metrics("local_tier", self.stats.as_dict(), context=self.name)
+
+        searched = iter(searched)
+        return [response if response is not None else next(searched) for response in local]
+
+    async def fetch_raw_content(self, urls, *, max_concurrency=5):
+        pages = await asyncio.to_thread(get_local_index().fetch, urls)
+        remaining = [url for url in urls if url not in pages]
+        if remaining:
+            pages.update(await self.web_backend.fetch_raw_content(remaining, max_concurrency=max_concurrency))
+        return pages
+
+async def search_with_lazy_raw_content(search_backend: SearchBackend,
+                                       queries: List[str],
+                                       top_k: int,
+                                       max_concurrency: int = 5) -> List[SearchResponse]:
+    """Two-phase search: snippets for every query, full page content for the best sources only.
+
+    The queries are first searched without raw content. The results are deduplicated by
+    canonical URL and ranked by score, and the full content is then fetched for the
+    `top_k` best sources only; the other results are dropped, since only these sources
+    go into the prompt. Requires a backend with `supports_lazy_raw_content`.
+
+    Returns:
+        One response per query, in order, holding only the selected sources.
+    """
+    responses = await search_backend.search(queries, include_raw_content=False, max_concurrency=max_concurrency)
+
+    # Best-scoring result for each canonical URL
+    best = {}
+    for response in responses:
+        for result in response.results:
+            url = canonicalize_url(result.url)
+            if url not in best or (result.score or 0.0) > (best[url].score or 0.0):
+                best[url] = result
+    # Values from the environment are strings
+    selected = heapq.nlargest(int(top_k), best.items(), key=lambda item: item[1].score or 0.0)
+
+    fetched = await search_backend.fetch_raw_content([result.url for _, result in selected], max_concurrency=max_concurrency)
+    raw_contents = {url: fetched.get(result.url) for url, result in selected}
+
+    logger = NewsletterLogger.get_current_logger()
+    if logger:
+        logger.log_metrics("lazy_raw_content", {
+            "sources": len(best),
+            "fetched": len(raw_contents),
+            "failed": sum(1 for raw_content in raw_contents.values() if raw_content is None)
+        }, context=search_backend.name)
+
+    return [
+        replace(response, results=tuple(
+            replace(result, raw_content=raw_contents[canonicalize_url(result.url)])
+            for result in response.results if canonicalize_url(result.url) in raw_contents
+        ))
+        for response in responses
+    ]
+
+async def stream_search_and_format(search_backend: SearchBackend,
+                                   queries: List[str],
+                                   max_tokens_per_source: int,
+                                   include_raw_content: bool = True,
+                                   token_budget: Optional[int] = None,
+                                   max_concurrency: int = 5,
+                                   near_duplicate_threshold: Optional[float] = None,
+                                   extraction: str = "head") -> Tuple[str, List[SearchResponse]]:
+    """Search every query and format the sources as each search completes.
+
+    Each query is searched on its own and its results are deduplicated and formatted as
+    soon as it returns, instead of waiting for the slowest query in the batch. Without a
+    `token_budget` the formatted string is identical to running `search` followed by
+    `deduplicate_and_format_sources`. With a budget, the remaining searches are
+    cancelled once the formatted sources reach it.
+
+    Returns:
+        The formatted source string and the responses received, in query order.
+    """
+    formatter = SourceFormatter(
+        max_tokens_per_source,
+        include_raw_content=include_raw_content,
+        token_budget=token_budget,
+        near_duplicate_threshold=near_duplicate_threshold,
+        extraction=extraction
+    )
+    # Values from the environment are strings
+    semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+    responses: Dict[int, SearchResponse] = {}
+
+    async def search_one(index: int, query: str) -> Tuple[int, SearchResponse]:
+        async with semaphore:
+            response, = await search_backend.search([query], include_raw_content=include_raw_content, max_concurrency=1)
+        return index, response
+
+    tasks = [asyncio.ensure_future(search_one(index, query)) for index, query in enumerate(queries)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, response = await next_done
+            responses[index] = response
+            formatter.add(index, response)
+            if formatter.full:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return formatter.render(), [responses[index] for index in sorted(responses)]
+
+def speculative_queries(topic: str,
+                        content_focus: Optional[str] = None,
+                        recurring_themes: Optional[Sequence[str]] = None,
+                        max_queries: int = 3) -> List[str]:
+    """Queries that are likely to be useful before any plan exists: the topic, then the topic with its focus and themes."""
+    queries = [topic]
+    if content_focus:
+        queries.append(f"{topic} {content_focus}")
+    queries.extend(f"{topic} {theme}" for theme in recurring_themes or [])
+    # Values from the environment are strings
+    return list(dict.fromkeys(query.strip() for query in queries if query and query.strip()))[:int(max_queries)]
+
+@dataclass
+class PrefetchStats(MetricCounters):
+    """Counters for the speculative searches of a run."""
+    prefetched: int = 0 # Speculative queries launched
+    served: int = 0 # Requested queries answered by a speculative search
+    searched: int = 0 # Requested queries that still needed their own search
+
+class SearchPrefetcher:
+    """Speculative searches started before the queries of a run are known.
+
+    The searches are launched as a task on the running event loop and keep running
+    while the caller waits on the LLM. `search` then serves each requested query that
+    is similar enough to a speculative one (see `cluster_queries`) from the speculative
+    results and searches the rest. A failed or cancelled prefetch is ignored and the
+    queries are searched normally.
+    """
+
+    def __init__(self,
+                 search_backend: SearchBackend,
+                 queries: List[str],
+                 include_raw_content: bool = False,
+                 max_concurrency: int = 5,
+                 similarity_threshold: Optional[float] = None):
+        self.search_backend = search_backend
+        self.queries = list(queries)
+        self.include_raw_content = include_raw_content
+        self.similarity_threshold = float(similarity_threshold) if similarity_threshold else 0.999
+        self.stats = PrefetchStats(prefetched=len(self.queries))
+        self._task = asyncio.get_running_loop().create_task(
+            search_backend.search(self.queries, include_raw_content=include_raw_content, max_concurrency=max_concurrency)
+        )
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+    async def _prefetched(self) -> Optional[List[SearchResponse]]:
+        if self._task.get_loop() is not asyncio.get_running_loop():
+            return None
+        try:
+            return await asyncio.shield(self._task)
+        except asyncio.CancelledError:
+            if not self._task.cancelled():
+                raise
+            return None
+        except Exception:
+            return None
+
+    async def search(self,
+                     search_backend: SearchBackend,
+                     queries: List[str],
+                     *,
+                     include_raw_content: bool = True,
+                     max_concurrency: int = 5) -> List[SearchResponse]:
+        """Search for every query, serving queries similar to a speculative one from the prefetch.
+
+        A speculative response is returned once even when several queries match it, so
+        the result can hold fewer responses than `queries`.
+        """
+        served: Dict[int, int] = {}
+        usable = (
+            search_backend is self.search_backend
+            and (self.include_raw_content or not include_raw_content)
+        )
+        prefetched = await self._prefetched() if usable else None
+        if prefetched is not None:
+            # Speculative queries come first, so they lead the clusters they belong to
+            for cluster in cluster_queries(self.queries + list(queries), self.similarity_threshold):
+                if cluster[0] < len(self.queries):
+                    for index in cluster[1:]:
+                        if index >= len(self.queries):
+                            served[index - len(self.queries)] = cluster[0]
+
+        remaining = [query for index, query in enumerate(queries) if index not in served]
+        responses = await search_backend.search(remaining, include_raw_content=include_raw_content, max_concurrency=max_concurrency) if remaining else []
+
+        self.stats.served += len(served)
+        self.stats.searched += len(remaining)
+        logger = NewsletterLogger.get_current_logger()
+        if logger:
+            logger.log_metrics("search_prefetch", self.stats.as_dict(), context=search_backend.name)
+
+        # Keep the query order, with each speculative response at its first match
+        searched = iter(responses)
+        results, returned = [], set()
+        for index in range(len(queries)):
+            if index not in served:
+                results.append(next(searched))
+            elif served[index] not in returned:
+                returned.add(served[index])
+                results.append(prefetched[served[index]])
+        return results
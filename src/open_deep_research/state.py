@@ -1,4 +1,5 @@
-from typing import Annotated, List, TypedDict, Literal
+from dataclasses import dataclass
+from typing import Annotated, List, Optional, Tuple, TypedDict, Literal, Union
 from pydantic import BaseModel, Field
 import operator
 
@@ -37,6 +38,57 @@ class Feedback(BaseModel):
         description="List of follow-up search queries.",
     )
 
+@dataclass(frozen=True, slots=True)
+class SearchResult:
+    """A single search hit, kept compact since large runs hold thousands of them."""
+    title: str
+    url: str
+    content: str # Summary/snippet of content
+    score: float # Relevance score
+    raw_content: Optional[str] = None # Full page content if available
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SearchResult":
+        return cls(
+            title=data.get("title") or "",
+            url=data["url"],
+            content=data.get("content") or "",
+            score=float(data.get("score") or 0.0),
+            raw_content=data.get("raw_content")
+        )
+
+    def to_dict(self) -> dict:
+        return {"title": self.title, "url": self.url, "content": self.content, "score": self.score, "raw_content": self.raw_content}
+
+@dataclass(frozen=True, slots=True)
+class SearchResponse:
+    """The results returned by a search backend for one query."""
+    query: str
+    results: Tuple[SearchResult, ...]
+    answer: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SearchResponse":
+        """Build a response from the Tavily response format used by every backend."""
+        return cls(
+            query=data.get("query") or "",
+            results=tuple(SearchResult.from_dict(result) for result in data.get("results") or ()),
+            answer=data.get("answer")
+        )
+
+    @classmethod
+    def coerce(cls, data: Union["SearchResponse", dict]) -> "SearchResponse":
+        return data if isinstance(data, cls) else cls.from_dict(data)
+
+    def to_dict(self) -> dict:
+        return {
+            "query": self.query,
+            "follow_up_questions": None,
+            "answer": self.answer,
+            "images": [],
+            "results": [result.to_dict() for result in self.results]
+        }
+
 class ReportStateInput(TypedDict):
     topic: str # Report topic
     
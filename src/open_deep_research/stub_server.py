@@ -0,0 +1,520 @@
+"""Local stand-in for the Tavily, Perplexity, Anthropic and OpenAI HTTP APIs.
+
+Lets both graphs run end to end without provider quota, to measure throughput and tail
+latency under provider-like behavior: each provider has a log-normal latency
+distribution, an output token rate, injected 429s and server errors, and canned
+payload sizes. Start the server, then point the clients at it:
+
+    python -m src.open_deep_research.stub_server --port 8765 [--config stub.json]
+
+    export TAVILY_BASE_URL=http://127.0.0.1:8765/tavily
+    export PERPLEXITY_BASE_URL=http://127.0.0.1:8765/perplexity
+    export ANTHROPIC_BASE_URL=http://127.0.0.1:8765/anthropic
+    export OPENAI_BASE_URL=http://127.0.0.1:8765/openai/v1
+
+The config file overrides `DEFAULT_PROFILES` per provider, and may list canned
+`responses`: {"provider": ..., "pattern": <regex matched against the prompt>,
+"content": ...}. LLM calls without a matching canned response get filler text, or
+arguments generated from the JSON schema when a tool or response format is forced.
+Prompt caching is simulated: Anthropic prefixes up to `cache_control` breakpoints and
+OpenAI prefixes (from 1024 tokens, in 128 token steps) seen before are reported as
+cached input tokens in the usage.
+Request counts per provider and outcome are served at GET /stats.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "tavily": {
+        "latency_ms": {"median": 800, "p99": 3000},
+        "rate_limit_rate": 0.0, # Fraction of requests answered with a 429
+        "error_rate": 0.0, # Fraction of requests answered with a 5xx
+        "results": 5, # Results per search, capped by max_results
+        "snippet_bytes": 400,
+        "raw_content_bytes": 20000
+    },
+    "perplexity": {
+        "latency_ms": {"median": 2500, "p99": 8000},
+        "rate_limit_rate": 0.0,
+        "error_rate": 0.0,
+        "citations": 5,
+        "output_tokens": 400
+    },
+    "anthropic": {
+        "latency_ms": {"median": 600, "p99": 2500}, # Time to first token
+        "tokens_per_second": 60,
+        "rate_limit_rate": 0.0,
+        "error_rate": 0.0,
+        "output_tokens": 500
+    },
+    "openai": {
+        "latency_ms": {"median": 500, "p99": 2000},
+        "tokens_per_second": 80,
+        "rate_limit_rate": 0.0,
+        "error_rate": 0.0,
+        "output_tokens": 500
+    }
+}
+
+FILLER_WORDS = (
+    "the research shows that recent results in this area point to steady progress while "
+    "several open questions remain about cost scale adoption and long term effects"
+).split()
+Z_99 = 2.326 # 99th percentile of the standard normal distribution
+PROMPT_CACHE_MIN_TOKENS = 1024 # Shortest cacheable prefix
+OPENAI_CACHE_INCREMENT = 128 # OpenAI caches prefixes in steps of this many tokens
+
+def sample_latency(latency_ms: Dict[str, float], rng: random.Random) -> float:
+    """Draw a latency in seconds from a log-normal distribution fitted to its median and p99."""
+    median = max(latency_ms.get("median", 0), 0)
+    if median <= 0:
+        return 0.0
+    p99 = max(latency_ms.get("p99", median), median)
+    sigma = (math.log(p99) - math.log(median)) / Z_99
+    return rng.lognormvariate(math.log(median), sigma) / 1000
+
+def filler_text(tokens: int, seed: int = 0) -> str:
+    """Roughly `tokens` tokens of text (about one token per word)."""
+    return " ".join(FILLER_WORDS[(seed + i) % len(FILLER_WORDS)] for i in range(max(1, tokens)))
+
+def filler_bytes(size: int, seed: int = 0) -> str:
+    text = filler_text(size // 5 + 1, seed)
+    return text[:size]
+
+def fake_from_schema(schema: Dict[str, Any], definitions: Optional[Dict[str, Any]] = None) -> Any:
+    """Build a value that validates against a (simple) JSON schema."""
+    definitions = definitions if definitions is not None else {**schema.get("definitions", {}), **schema.get("$defs", {})}
+    if "$ref" in schema:
+        return fake_from_schema(definitions[schema["$ref"].split("/")[-1]], definitions)
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [option for option in schema[key] if option.get("type") != "null"] or schema[key]
+            return fake_from_schema(options[0], definitions)
+    if "allOf" in schema:
+        return fake_from_schema(schema["allOf"][0], definitions)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    schema_type = schema.get("type", "object")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+    if schema_type == "object":
+        return {name: fake_from_schema(prop, definitions) for name, prop in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        return [fake_from_schema(schema.get("items", {"type": "string"}), definitions) for _ in range(max(1, schema.get("minItems", 2)))]
+    if schema_type == "integer":
+        return max(1, schema.get("minimum", 1))
+    if schema_type == "number":
+        return max(0.5, schema.get("minimum", 0.5))
+    if schema_type == "boolean":
+        return True
+    if schema_type == "null":
+        return None
+    return filler_text(8)
+
+class StubState:
+    """Profiles, canned responses and counters shared by the request handlers."""
+
+    def __init__(self, profiles: Dict[str, Dict[str, Any]], responses: List[Dict[str, Any]], seed: Optional[int] = None):
+        self.profiles = profiles
+        self.responses = [dict(rule, pattern=re.compile(rule.get("pattern", ""), re.DOTALL)) for rule in responses]
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.prompt_cache: set = set()
+
+    def random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def latency(self, provider: str) -> float:
+        with self._lock:
+            return sample_latency(self.profiles[provider]["latency_ms"], self._rng)
+
+    def count(self, provider: str, outcome: str) -> None:
+        with self._lock:
+            self.stats[provider]["requests"] += 1
+            self.stats[provider][outcome] += 1
+
+    def cached_prefix(self, prefixes: List[str]) -> int:
+        """Return the tokens of the longest of `prefixes` seen before, and remember them all.
+        Tokens are estimated at four characters each, like the rest of the stub.
+        """
+        cached = 0
+        with self._lock:
+            for prefix in prefixes:
+                if len(prefix) // 4 < PROMPT_CACHE_MIN_TOKENS:
+                    continue
+                key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+                if key in self.prompt_cache:
+                    cached = max(cached, len(prefix) // 4)
+                self.prompt_cache.add(key)
+        return cached
+
+    def canned(self, provider: str, prompt: str) -> Optional[str]:
+        for rule in self.responses:
+            if rule.get("provider", provider) == provider and rule["pattern"].search(prompt):
+                return rule["content"]
+        return None
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState # Set on the server's handler class
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- plumbing --------------------------------------------------------------
+    def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _start_stream(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def _send_event(self, data: Any, event: Optional[str] = None) -> None:
+        chunk = (f"event: {event}\n" if event else "") + f"data: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+        self.wfile.write(chunk.encode("utf-8"))
+        self.wfile.flush()
+
+    def _inject_failure(self, provider: str) -> bool:
+        """Answer with an injected 429 or 5xx, in the provider's error format; True if one was sent."""
+        profile = self.state.profiles[provider]
+        draw = self.state.random()
+        if draw < profile.get("rate_limit_rate", 0):
+            status, kind = 429, "rate_limit_error"
+        elif draw < profile.get("rate_limit_rate", 0) + profile.get("error_rate", 0):
+            status, kind = (529 if provider == "anthropic" else 500), "overloaded_error"
+        else:
+            return False
+        time.sleep(self.state.latency(provider) / 4)
+        self.state.count(provider, str(status))
+        if provider == "anthropic":
+            body = {"type": "error", "error": {"type": kind, "message": "Injected by stub server"}}
+        elif provider == "tavily":
+            body = {"detail": {"error": "Injected by stub server"}}
+        else:
+            body = {"error": {"type": kind, "message": "Injected by stub server", "code": status}}
+        self._send_json(status, body, {"Retry-After": "1"} if status == 429 else None)
+        return True
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, {provider: dict(counts) for provider, counts in self.state.stats.items()})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            request = {}
+        routes = {
+            "/tavily/search": ("tavily", self._tavily_search),
+            "/tavily/extract": ("tavily", self._tavily_extract),
+            "/perplexity/chat/completions": ("perplexity", self._perplexity),
+            "/anthropic/v1/messages": ("anthropic", self._anthropic),
+            "/openai/v1/chat/completions": ("openai", self._openai)
+        }
+        route = routes.get(self.path.split("?")[0].rstrip("/"))
+        if route is None:
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+        provider, handler = route
+        if not self._inject_failure(provider):
+            handler(request)
+            self.state.count(provider, "ok")
+
+    # -- search providers ----------------------------------------------------
+    def _tavily_search(self, request):
+        profile = self.state.profiles["tavily"]
+        time.sleep(self.state.latency("tavily"))
+        query = request.get("query", "")
+        # Stable across processes, unlike hash() on strings
+        seed = zlib.crc32(query.encode("utf-8"))
+        results = [
+            {
+                "title": f"{query} - result {i + 1}",
+                "url": f"https://stub.example.com/{seed % 100000}/{i}",
+                "content": filler_bytes(profile["snippet_bytes"], seed + i),
+                "score": round(1 - i / 10, 2),
+                "raw_content": filler_bytes(profile["raw_content_bytes"], seed + i) if request.get("include_raw_content") else None
+            }
+            for i in range(min(profile["results"], request.get("max_results", 5)))
+        ]
+        self._send_json(200, {
+            "query": query, "follow_up_questions": None, "answer": None, "images": [],
+            "results": results, "response_time": 0
+        })
+
+    def _tavily_extract(self, request):
+        profile = self.state.profiles["tavily"]
+        time.sleep(self.state.latency("tavily"))
+        urls = request.get("urls") or []
+        urls = [urls] if isinstance(urls, str) else urls
+        self._send_json(200, {
+            "results": [{"url": url, "raw_content": filler_bytes(profile["raw_content_bytes"], i)} for i, url in enumerate(urls)],
+            "failed_results": [], "response_time": 0
+        })
+
+    def _perplexity(self, request):
+        profile = self.state.profiles["perplexity"]
+        time.sleep(self.state.latency("perplexity"))
+        prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+        content = self.state.canned("perplexity", prompt) or filler_text(profile["output_tokens"])
+        self._send_json(200, {
+            "id": str(uuid.uuid4()), "model": request.get("model", "sonar-pro"), "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "citations": [f"https://stub.example.com/citation/{i}" for i in range(profile["citations"])],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content.split())}
+        })
+
+    # -- LLM providers ---------------------------------------------------------
+    def _generate(self, provider: str, prompt: str, max_tokens: Optional[int]) -> str:
+        canned = self.state.canned(provider, prompt)
+        if canned is not None:
+            return canned
+        tokens = self.state.profiles[provider]["output_tokens"]
+        return filler_text(min(tokens, max_tokens or tokens))
+
+    def _pace(self, provider: str, tokens: int) -> None:
+        """Sleep for the time the provider would take to generate `tokens` tokens."""
+        rate = self.state.profiles[provider].get("tokens_per_second")
+        if rate:
+            time.sleep(tokens / rate)
+
+    def _stream_words(self, provider: str, text: str):
+        """Yield pieces of `text`, paced at the provider's token rate."""
+        pieces = re.findall(r"\S+\s*", text) or [text]
+        for piece in pieces:
+            self._pace(provider, 1)
+            yield piece
+
+    def _anthropic(self, request):
+        prompt = json.dumps(request.get("system", "")) + json.dumps(request.get("messages", []))
+        model = request.get("model", "claude-stub")
+        # Anthropic reports cached tokens apart from input_tokens
+        prefixes = anthropic_breakpoint_prefixes(request)
+        cache_read = self.state.cached_prefix(prefixes)
+        cache_creation = max([len(prefix) // 4 for prefix in prefixes if len(prefix) // 4 >= PROMPT_CACHE_MIN_TOKENS] + [cache_read]) - cache_read
+        input_tokens = max(len(prompt) // 4 - cache_read - cache_creation, 0)
+        usage = {"input_tokens": input_tokens, "cache_read_input_tokens": cache_read, "cache_creation_input_tokens": cache_creation}
+        time.sleep(self.state.latency("anthropic"))
+
+        # Forced tool use, e.g. with_structured_output
+        tool_choice = request.get("tool_choice") or {}
+        tools = {tool["name"]: tool for tool in request.get("tools", [])}
+        forced = tool_choice.get("name") if tool_choice.get("type") == "tool" else (next(iter(tools), None) if tool_choice.get("type") == "any" else None)
+        if forced in tools:
+            canned = self.state.canned("anthropic", prompt)
+            arguments = json.loads(canned) if canned is not None else fake_from_schema(tools[forced].get("input_schema", {}))
+            output_tokens = len(json.dumps(arguments)) // 4
+            self._pace("anthropic", output_tokens)
+            content = [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}", "name": forced, "input": arguments}]
+            stop_reason = "tool_use"
+        else:
+            text = self._generate("anthropic", prompt, request.get("max_tokens"))
+            output_tokens = len(text.split())
+            if request.get("stream"):
+                self._anthropic_stream(model, text, usage, output_tokens)
+                return
+            self._pace("anthropic", output_tokens)
+            content = [{"type": "text", "text": text}]
+            stop_reason = "end_turn"
+
+        self._send_json(200, {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant", "model": model,
+            "content": content, "stop_reason": stop_reason, "stop_sequence": None,
+            "usage": dict(usage, output_tokens=output_tokens)
+        })
+
+    def _anthropic_stream(self, model, text, usage, output_tokens):
+        self._start_stream()
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant", "model": model,
+            "content": [], "stop_reason": None, "stop_sequence": None,
+            "usage": dict(usage, output_tokens=1)
+        }
+        self._send_event({"type": "message_start", "message": message}, "message_start")
+        self._send_event({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}, "content_block_start")
+        for piece in self._stream_words("anthropic", text):
+            self._send_event({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}}, "content_block_delta")
+        self._send_event({"type": "content_block_stop", "index": 0}, "content_block_stop")
+        self._send_event({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": output_tokens}}, "message_delta")
+        self._send_event({"type": "message_stop"}, "message_stop")
+
+    def _openai(self, request):
+        prompt = json.dumps(request.get("messages", []))
+        model = request.get("model", "gpt-stub")
+        prompt_tokens = len(prompt) // 4
+        cached_tokens = self.state.cached_prefix([
+            prompt[:tokens * 4] for tokens in range(PROMPT_CACHE_MIN_TOKENS, prompt_tokens + 1, OPENAI_CACHE_INCREMENT)
+        ])
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": 0, "total_tokens": prompt_tokens, "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+        time.sleep(self.state.latency("openai"))
+        canned = self.state.canned("openai", prompt)
+
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+        tool_choice = request.get("tool_choice")
+        tools = {tool["function"]["name"]: tool["function"] for tool in request.get("tools", [])}
+        forced = tool_choice.get("function", {}).get("name") if isinstance(tool_choice, dict) else (next(iter(tools), None) if tool_choice == "required" else None)
+        response_format = request.get("response_format") or {}
+        if forced in tools:
+            arguments = canned if canned is not None else json.dumps(fake_from_schema(tools[forced].get("parameters", {})))
+            message["tool_calls"] = [{"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function", "function": {"name": forced, "arguments": arguments}}]
+            finish_reason = "tool_calls"
+            completion_tokens = len(arguments) // 4
+        elif response_format.get("type") == "json_schema":
+            message["content"] = canned if canned is not None else json.dumps(fake_from_schema(response_format["json_schema"].get("schema", {})))
+            completion_tokens = len(message["content"]) // 4
+        else:
+            message["content"] = canned if canned is not None else self._generate("openai", prompt, request.get("max_completion_tokens") or request.get("max_tokens"))
+            completion_tokens = len(message["content"].split())
+            if request.get("stream"):
+                self._openai_stream(model, message["content"], dict(usage, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens), request)
+                return
+
+        self._pace("openai", completion_tokens)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": dict(usage, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens)
+        })
+
+    def _openai_stream(self, model, text, usage, request):
+        self._start_stream()
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+        def chunk(delta, finish_reason=None, usage=None):
+            body = {
+                "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else []
+            }
+            if usage is not None:
+                body["usage"] = usage
+            return body
+
+        self._send_event(chunk({"role": "assistant", "content": ""}))
+        for piece in self._stream_words("openai", text):
+            self._send_event(chunk({"content": piece}))
+        self._send_event(chunk({}, "stop"))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._send_event(chunk({}, usage=usage))
+        self._send_event("[DONE]")
+
+def anthropic_breakpoint_prefixes(request: Dict[str, Any]) -> List[str]:
+    """Return the request prefixes (tools, system, then messages) ending at each `cache_control` block."""
+    system = request.get("system") or []
+    blocks = [{"type": "text", "text": system}] if isinstance(system, str) else list(system)
+    for message in request.get("messages", []):
+        content = message["content"]
+        for block in [{"type": "text", "text": content}] if isinstance(content, str) else content:
+            blocks.append(dict(block, role=message["role"]))
+            # Tool results carry their own text blocks, which can hold a breakpoint too
+            if isinstance(block.get("content"), list):
+                blocks.extend(block["content"])
+
+    prefix = json.dumps(request.get("tools", []))
+    prefixes = []
+    for block in blocks:
+        prefix += json.dumps({key: value for key, value in block.items() if key != "cache_control"})
+        if "cache_control" in block:
+            prefixes.append(prefix)
+    return prefixes
+
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+    """Merge a JSON config file over the default profiles."""
+    profiles = {provider: dict(profile) for provider, profile in DEFAULT_PROFILES.items()}
+    config = {}
+    if path:
+        with open(path) as f:
+            config = json.load(f)
+    for provider, overrides in config.get("profiles", {}).items():
+        profiles[provider].update(overrides)
+    return {"profiles": profiles, "responses": config.get("responses", []), "seed": config.get("seed")}
+
+def make_server(host: str = "127.0.0.1",
+                port: int = 8765,
+                profiles: Optional[Dict[str, Dict[str, Any]]] = None,
+                responses: Optional[List[Dict[str, Any]]] = None,
+                seed: Optional[int] = None) -> ThreadingHTTPServer:
+    """Create the stub server (not yet serving); use port 0 to pick a free port."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "state": StubState(profiles or load_config(None)["profiles"], responses or [], seed)
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def stub_environment(base_url: str) -> Dict[str, str]:
+    """Environment variables pointing every provider client at a stub server."""
+    base_url = base_url.rstrip("/")
+    return {
+        "TAVILY_BASE_URL": f"{base_url}/tavily",
+        "PERPLEXITY_BASE_URL": f"{base_url}/perplexity",
+        "ANTHROPIC_BASE_URL": f"{base_url}/anthropic",
+        "OPENAI_BASE_URL": f"{base_url}/openai/v1"
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the search and LLM provider APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", help="JSON file with provider profile overrides and canned responses")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply every latency by this factor")
+    parser.add_argument("--rate-limit-rate", type=float, help="Override the 429 rate of every provider")
+    parser.add_argument("--error-rate", type=float, help="Override the 5xx rate of every provider")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    for profile in config["profiles"].values():
+        profile["latency_ms"] = {key: value * args.latency_scale for key, value in profile["latency_ms"].items()}
+        if args.rate_limit_rate is not None:
+            profile["rate_limit_rate"] = args.rate_limit_rate
+        if args.error_rate is not None:
+            profile["error_rate"] = args.error_rate
+
+    server = make_server(args.host, args.port, config["profiles"], config["responses"], args.seed if args.seed is not None else config["seed"])
+    base_url = f"http://{args.host}:{server.server_address[1]}"
+    # The export lines go to stdout so they can be copied into a shell
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+    logger = logging.getLogger(__name__)
+    logger.info("Stub providers listening on %s", base_url)
+    for name, value in stub_environment(base_url).items():
+        logger.info("export %s=%s", name, value)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+import functools
+import hashlib
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import tiktoken
+except ImportError: # Fall back to a character estimate without tiktoken
+    tiktoken = None
+
+WORD_PATTERN = re.compile(r"\w+")
+
+def words(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return WORD_PATTERN.findall(text.lower())
+
+# ---------------------------------------------------------------------------
+# Token counting and truncation
+# ---------------------------------------------------------------------------
+TOKENIZER_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN_ESTIMATE = 4 # Used when no tokenizer is available
+TYPICAL_CHARS_PER_TOKEN = 5 # Prefix length per token tokenized first: enough for most prose to hold the budget
+MAX_CHARS_PER_TOKEN = 8 # Prefix length per token tokenized before falling back to the whole text
+SENTENCE_END_PATTERN = re.compile(r"[.!?][\"')\]]*\s|\n")
+SENTENCE_BACKOFF = 0.2 # Fraction of the budget we are willing to give up to end on a sentence
+
+@functools.cache
+def get_tokenizer(encoding_name: str = TOKENIZER_ENCODING):
+    """Load a tiktoken encoding once; returns None if tiktoken or the encoding is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    """Count the tokens in a text, estimating from its length without a tokenizer."""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return len(text) // CHARS_PER_TOKEN_ESTIMATE
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+def _cut_at_sentence_end(text: str) -> str:
+    """Shorten a truncated text to its last sentence end, if one is close to the cut."""
+    floor = int(len(text) * (1 - SENTENCE_BACKOFF))
+    last_end = None
+    for match in SENTENCE_END_PATTERN.finditer(text, floor):
+        last_end = match.end()
+    return text[:last_end].rstrip() if last_end else text
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """Truncate a text to at most `max_tokens` tokens, preferably at a sentence end.
+
+    Texts whose UTF-8 size is within the budget are returned without tokenizing, since
+    a token always covers at least one byte. Texts longer than TYPICAL_CHARS_PER_TOKEN
+    characters per token of budget are almost always over it, so a prefix of that length
+    is tokenized first and, when it holds the budget, cut without looking further.
+    Otherwise a prefix of MAX_CHARS_PER_TOKEN characters per token is tokenized, and the
+    whole text only when that prefix comes up short.
+
+    Returns:
+        The (possibly) truncated text and whether it was truncated.
+    """
+    if len(text) <= max_tokens and len(text.encode("utf-8")) <= max_tokens:
+        return text, False
+
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        char_limit = max_tokens * CHARS_PER_TOKEN_ESTIMATE
+        if len(text) <= char_limit:
+            return text, False
+        return _cut_at_sentence_end(text[:char_limit]), True
+
+    tokens = None
+    if len(text) > max_tokens * TYPICAL_CHARS_PER_TOKEN:
+        tokens = tokenizer.encode(text[:max_tokens * TYPICAL_CHARS_PER_TOKEN], disallowed_special=())
+        if len(tokens) <= max_tokens:
+            tokens = None
+
+    prefix = text[:max_tokens * MAX_CHARS_PER_TOKEN]
+    if tokens is None:
+        tokens = tokenizer.encode(prefix, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        if len(prefix) == len(text):
+            return text, False
+        tokens = tokenizer.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text, False
+
+    # Decoding may split a multi-byte character at the cut
+    truncated = tokenizer.decode(tokens[:max_tokens]).rstrip("\ufffd")
+    return _cut_at_sentence_end(truncated), True
+
+# ---------------------------------------------------------------------------
+# Passage selection (BM25 over the passages of a single document)
+# ---------------------------------------------------------------------------
+PASSAGE_WORDS = 120 # Target passage length in words
+PASSAGE_SEPARATOR = "\n\n[...]\n\n" # Marks the text skipped between selected passages
+BM25_K1 = 1.5
+BM25_B = 0.75
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been but by can could did do does for
+from had has have how i if in into is it its latest many more most new not of on or
+other our should so some such than that the their them there these they this those to
+was were what when where which while who why will with would you your
+""".split())
+
+def query_terms(text: str) -> List[str]:
+    """Lowercase word tokens of a query, without stopwords."""
+    return [word for word in words(text) if word not in STOPWORDS]
+
+def split_passages(text: str, target_words: int = PASSAGE_WORDS) -> List[str]:
+    """Split a document into passages of roughly `target_words` words.
+
+    Paragraphs (non-empty lines) are merged until they reach the target, and paragraphs
+    much longer than the target are split on sentence ends.
+    """
+    passages = []
+    current: List[str] = []
+    current_words = 0
+    for paragraph in text.splitlines():
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        length = len(paragraph.split())
+        if length > 2 * target_words:
+            # Cut an oversized paragraph into sentence runs of about the target length
+            pieces: List[str] = []
+            piece_words = 0
+            for sentence in SENTENCE_SPLIT_PATTERN.split(paragraph):
+                pieces.append(sentence)
+                piece_words += len(sentence.split())
+                if piece_words >= target_words:
+                    passages.append(" ".join(pieces))
+                    pieces, piece_words = [], 0
+            if pieces:
+                passages.append(" ".join(pieces))
+            continue
+        if current and current_words + length > target_words:
+            passages.append("\n".join(current))
+            current, current_words = [], 0
+        current.append(paragraph)
+        current_words += length
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+def bm25_scores(passages: Sequence[str], terms: Sequence[str], k1: float = BM25_K1, b: float = BM25_B) -> List[float]:
+    """Score each passage against the query terms with Okapi BM25, using the passages as the corpus."""
+    tokenized = [words(passage) for passage in passages]
+    if not tokenized:
+        return []
+    average_length = sum(map(len, tokenized)) / len(tokenized) or 1.0
+    terms = set(terms)
+    document_frequency = Counter(term for tokens in tokenized for term in terms.intersection(tokens))
+    idf = {
+        term: math.log(1 + (len(tokenized) - count + 0.5) / (count + 0.5))
+        for term, count in document_frequency.items()
+    }
+    scores = []
+    for tokens in tokenized:
+        frequencies = Counter(tokens)
+        norm = k1 * (1 - b + b * len(tokens) / average_length)
+        scores.append(sum(
+            weight * frequencies[term] * (k1 + 1) / (frequencies[term] + norm)
+            for term, weight in idf.items() if term in frequencies
+        ))
+    return scores
+
+def select_passages(text: str, queries: Sequence[str], max_tokens: int) -> Tuple[str, bool]:
+    """Keep the passages of a text that best match the queries, within `max_tokens` tokens.
+
+    Passages are ranked by BM25 against the terms of all `queries` and taken greedily
+    while they fit the budget; the selection is returned in document order, with
+    `PASSAGE_SEPARATOR` where text was skipped. Texts that already fit are returned
+    unchanged, and when no query term occurs in the text this falls back to keeping its
+    beginning, like `truncate_to_tokens`.
+
+    Returns:
+        The selected text and whether anything was left out.
+    """
+    head, truncated = truncate_to_tokens(text, max_tokens)
+    if not truncated:
+        return text, False
+
+    passages = split_passages(text)
+    scores = bm25_scores(passages, query_terms(" ".join(queries)))
+    if not any(scores):
+        return head, True
+
+    separator_tokens = count_tokens(PASSAGE_SEPARATOR)
+    selected = []
+    used = 0
+    for i in sorted(range(len(passages)), key=lambda i: scores[i], reverse=True):
+        if scores[i] <= 0:
+            break
+        cost = count_tokens(passages[i]) + (separator_tokens if selected else 0)
+        if used + cost <= max_tokens:
+            selected.append(i)
+            used += cost
+    if not selected:
+        # Even the best passage is over budget: keep as much of it as fits
+        best = max(range(len(passages)), key=lambda i: scores[i])
+        passage, _ = truncate_to_tokens(passages[best], max_tokens)
+        return passage, True
+    return PASSAGE_SEPARATOR.join(passages[i] for i in sorted(selected)), True
+
+# ---------------------------------------------------------------------------
+# Query normalization and clustering
+# ---------------------------------------------------------------------------
+STEM_SUFFIXES = ("ments", "ment", "ness", "ings", "ing", "ies", "ied", "es", "ed", "ly", "s")
+MIN_STEM_LENGTH = 3
+# Words the suffix rules would turn into a different word ("news" is not the plural of "new")
+STEM_EXCEPTIONS = frozenset("""
+always analytics bias canvas chaos ethics lens means mathematics news perhaps physics
+politics series species statistics thanks whereas
+""".split())
+
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer, enough to match plural/verb/adverb variants of a
+    word in short queries (e.g. "changes", "changed", "changing" and "change" all give "chang").
+    Words in `STEM_EXCEPTIONS` are kept as they are.
+    """
+    if word in STEM_EXCEPTIONS:
+        return word
+    for suffix in STEM_SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < MIN_STEM_LENGTH:
+            continue
+        base = word[:-len(suffix)]
+        if suffix in ("ies", "ied"):
+            return base + "y"
+        if suffix == "s" and base.endswith(("s", "u", "i")):
+            # "class", "status", "analysis" are not plurals
+            return word
+        if suffix == "es" and not base.endswith(("s", "x", "z", "ch", "sh")):
+            # "changes" is "change" + "s"
+            base = word[:-1]
+        word = base
+        break
+    if word.endswith("e") and len(word) > MIN_STEM_LENGTH + 1:
+        return word[:-1]
+    return word
+
+def normalize_query_terms(query: str) -> List[str]:
+    """Lowercase, drop stopwords and stem the words of a query."""
+    return [stem(word) for word in query_terms(query)]
+
+def cluster_queries(queries: Sequence[str], threshold: float) -> List[List[int]]:
+    """Group near-duplicate queries by the cosine similarity of their TF-IDF vectors.
+
+    Queries are normalized with `normalize_query_terms`, so queries differing only in
+    case, word order, filler words or word endings get identical vectors. Clusters are
+    formed greedily in query order: each query not yet clustered starts a cluster and
+    takes every later query with a similarity of at least `threshold`.
+
+    Returns:
+        The clusters as lists of query indices, the first index being the representative.
+    """
+    documents = [normalize_query_terms(query) for query in queries]
+    vocabulary: Dict[str, int] = {}
+    for terms in documents:
+        for term in terms:
+            vocabulary.setdefault(term, len(vocabulary))
+
+    counts = np.zeros((len(documents), max(1, len(vocabulary))))
+    for row, terms in enumerate(documents):
+        for term in terms:
+            counts[row, vocabulary[term]] += 1
+    document_frequency = (counts > 0).sum(axis=0)
+    vectors = counts * (np.log((1 + len(documents)) / (1 + document_frequency)) + 1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    similarity = vectors @ vectors.T
+
+    clusters = []
+    assigned = np.zeros(len(documents), dtype=bool)
+    for i in range(len(documents)):
+        if assigned[i]:
+            continue
+        if documents[i]:
+            members = np.flatnonzero(~assigned & (similarity[i] >= threshold - 1e-9))
+            members = [i] + [int(j) for j in members if j > i]
+        else:
+            # Nothing left to compare after normalization: only merge exact repeats
+            members = [j for j in range(i, len(queries)) if not assigned[j] and queries[j].strip().lower() == queries[i].strip().lower()]
+        assigned[members] = True
+        clusters.append(members)
+    return clusters
+
+# ---------------------------------------------------------------------------
+# Token budget allocation
+# ---------------------------------------------------------------------------
+MIN_ALLOCATION_WEIGHT = 0.05 # Floor for relevance weights, so low-scored sources still get a share
+
+def allocate_token_budget(demands: Sequence[int], weights: Sequence[Optional[float]], budget: int) -> List[int]:
+    """Split a token budget across items by weighted water-filling.
+
+    Each item asks for `demands[i]` tokens and is entitled to a share of the remaining
+    budget proportional to its weight. Items whose demand fits their share get exactly
+    their demand, and what they leave unused is shared again among the others, until
+    every remaining item demands more than its share; those get their share. The total
+    allocated never exceeds `budget`.
+    """
+    weights = [max(weight or 0.0, MIN_ALLOCATION_WEIGHT) for weight in weights]
+    allocation = [0] * len(demands)
+    active = [i for i in range(len(demands)) if demands[i] > 0]
+    remaining = max(0, budget)
+    while active and remaining > 0:
+        total_weight = sum(weights[i] for i in active)
+        satisfied = [i for i in active if demands[i] <= remaining * weights[i] / total_weight]
+        if not satisfied:
+            for i in active:
+                allocation[i] = int(remaining * weights[i] / total_weight)
+            break
+        for i in satisfied:
+            allocation[i] = demands[i]
+            remaining -= demands[i]
+        active = [i for i in active if demands[i] > allocation[i]]
+    return allocation
+
+# ---------------------------------------------------------------------------
+# Near-duplicate detection (bottom-k MinHash over word shingles)
+# ---------------------------------------------------------------------------
+MINHASH_SIZE = 128 # Number of hashes kept per signature
+SHINGLE_SIZE = 5 # Words per shingle
+MIN_FINGERPRINT_WORDS = 50 # Shorter texts (snippets, placeholders) are never treated as duplicates
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+def minhash_signature(text: str, size: int = MINHASH_SIZE, shingle_size: int = SHINGLE_SIZE) -> Optional[FrozenSet[int]]:
+    """Return the bottom-k MinHash signature of a text: the `size` smallest hashes of its
+    word shingles. Returns None for texts too short to fingerprint reliably.
+    """
+    tokens = words(text)
+    if len(tokens) < MIN_FINGERPRINT_WORDS:
+        return None
+    shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    return frozenset(heapq.nsmallest(size, map(_hash64, shingles)))
+
+def estimate_similarity(a: FrozenSet[int], b: FrozenSet[int], size: int = MINHASH_SIZE) -> float:
+    """Estimate the Jaccard similarity of two texts from their bottom-k signatures."""
+    union = heapq.nsmallest(size, a | b)
+    if not union:
+        return 0.0
+    return sum(1 for value in union if value in a and value in b) / len(union)
+
+def find_near_duplicates(texts: Sequence[str], scores: Sequence[float], threshold: float) -> List[int]:
+    """Return the indices of texts that are near-duplicates of a higher-scoring text.
+
+    Texts are visited from highest to lowest score and each one is compared with the
+    representatives kept so far; it is dropped when its estimated Jaccard similarity
+    with any of them reaches `threshold`.
+    """
+    signatures = [minhash_signature(text) for text in texts]
+    order = sorted(range(len(texts)), key=lambda i: scores[i], reverse=True)
+    kept: List[FrozenSet[int]] = []
+    duplicates = []
+    for i in order:
+        signature = signatures[i]
+        if signature is None:
+            continue
+        if any(estimate_similarity(signature, other) >= threshold for other in kept):
+            duplicates.append(i)
+        else:
+            kept.append(signature)
+    return sorted(duplicates)
@@ -0,0 +1,102 @@
+import warnings
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables.config import ensure_config, merge_configs
+from langgraph.config import get_config, get_stream_writer
+from langgraph.types import StreamWriter
+
+from src.open_deep_research.configuration import Configuration
+from src.open_deep_research.llm_cache import CACHE_HIT_KEY
+
+# Chat models switch to their streaming API when a handler of this (private) langchain-core
+# class is attached, which is how LangGraph's messages stream mode works. Without it, only
+# the "end" events are sent.
+try:
+    from langchain_core.tracers._streaming import _StreamingCallbackHandler
+    STREAMING_CALLBACKS = True
+except ImportError:
+    class _StreamingCallbackHandler:
+        pass
+    STREAMING_CALLBACKS = False
+
+# Events written to the graph's custom stream (`stream_mode="custom"`) while a section,
+# summary or draft is generated. Each event carries the node and the id of what is being
+# written (`section` in the report graph, `block_id` in the newsletter graph):
+#   {"event": "token", "node": ..., "block_id": ..., "index": 0, "text": "..."}
+#   {"event": "end", "node": ..., "block_id": ..., "text": <full text>, "cached": False}
+# "end" is sent as soon as the completion is done, before the node finishes (e.g. grading),
+# so consumers can post-process a section while the rest of the graph runs.
+TOKEN_EVENT = "token"
+END_EVENT = "end"
+
+class TokenStreamHandler(BaseCallbackHandler, _StreamingCallbackHandler):
+    """Callback handler that forwards the tokens of a chat model call to a stream writer.
+
+    Being a streaming handler, it makes the model use its streaming API even when it is
+    called with `ainvoke`, like LangGraph's `stream_mode="messages"` handler does; the
+    LLM response cache is still checked first, and a cache hit streams no tokens.
+    """
+
+    run_inline = True # Write the tokens in order, from the event loop
+
+    def __init__(self, writer: StreamWriter, tags: Dict[str, Any]):
+        self.writer = writer
+        self.tags = tags
+        self.tokens = 0
+
+    def tap_output_aiter(self, run_id: UUID, output):
+        return output
+
+    def tap_output_iter(self, run_id: UUID, output):
+        return output
+
+    def on_llm_new_token(self, token: Any, **kwargs: Any) -> None:
+        # Anthropic chunks carry content blocks; only text is forwarded
+        text = token if isinstance(token, str) else "".join(
+            block.get("text", "") for block in token if isinstance(block, dict)
+        )
+        if text:
+            self.writer({"event": TOKEN_EVENT, **self.tags, "index": self.tokens, "text": text})
+            self.tokens += 1
+
+def _stream_writer() -> Optional[StreamWriter]:
+    """Return the custom stream writer of the running node, or None when token streaming is off."""
+    try:
+        config = get_config()
+    except RuntimeError:
+        return None
+    if not Configuration.from_runnable_config(config).stream_tokens:
+        return None
+    return get_stream_writer()
+
+async def generate_streamed(model, messages: List[BaseMessage], **tags: Any) -> BaseMessage:
+    """Call `model` with `messages`, streaming its tokens to the graph's custom stream when
+    the run has `stream_tokens` enabled.
+
+    `tags` identify the generated text (e.g. `section=...` or `block_id=...`) in the
+    stream events, and are added to the call's metadata so `astream_events` and
+    `stream_mode="messages"` consumers can tell concurrent sections apart too.
+    """
+    try:
+        node = get_config().get("metadata", {}).get("langgraph_node")
+    except RuntimeError:
+        node = None
+    tags = {"node": node, **tags}
+    config = merge_configs(ensure_config(), {"metadata": tags})
+
+    writer = _stream_writer()
+    if writer is None:
+        return await model.ainvoke(messages, config=config)
+
+    if not STREAMING_CALLBACKS:
+        warnings.warn("This langchain-core version cannot stream tokens through callbacks; only end events are sent", stacklevel=2)
+        response = await model.ainvoke(messages, config=config)
+    else:
+        response = await model.ainvoke(messages, config=merge_configs(config, {"callbacks": [TokenStreamHandler(writer, tags)]}))
+    # Only completions restored by the LLM response cache are marked; see llm_cache.py
+    cached = bool(response.response_metadata.get(CACHE_HIT_KEY))
+    writer({"event": END_EVENT, **tags, "text": response.text(), "cached": cached})
+    return response
@@ -1,24 +1,367 @@
 
 import os
 import asyncio
+import threading
+import weakref
+import functools
 import requests
+import httpx
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
-from tavily import TavilyClient, AsyncTavilyClient
-from src.open_deep_research.state import Section
+from tavily.errors import UsageLimitExceededError
+from src.open_deep_research.state import Section, SearchResponse
+from src.open_deep_research.newsletter_state import ResearchBlock, ReconsiderationBlock, TemplateBuilderItem
+from src.open_deep_research.cache import cache_search_results, get_search_cache, search_cache_key
+from src.open_deep_research.concurrency import SearchControls, ProviderGovernor, RequestPolicy, http_status_code, is_overload_status
+from src.open_deep_research.logger import NewsletterLogger, MetricCounters
+from src.open_deep_research.blob_store import resolve_text
+from src.open_deep_research.clients import get_tavily_async_client
+from src.open_deep_research.llm_cache import get_llm_cache
+from src.open_deep_research.prompt_cache import get_prompt_cache_handler
+from src.open_deep_research.text_processing import find_near_duplicates, count_tokens, truncate_to_tokens, select_passages, allocate_token_budget, cluster_queries
 from langsmith import traceable
 
-tavily_client = TavilyClient()
-tavily_async_client = AsyncTavilyClient()
+# Provider endpoints can be redirected, e.g. to the local stand-in server in stub_server.py
+PERPLEXITY_BASE_URL = os.environ.get("PERPLEXITY_BASE_URL", "https://api.perplexity.ai")
 
-def deduplicate_and_format_sources(search_response, max_tokens_per_source, include_raw_content=True):
+PERPLEXITY_API_URL = f"{PERPLEXITY_BASE_URL}/chat/completions"
+PERPLEXITY_MAX_CONNECTIONS = 20
+PERPLEXITY_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# One keep-alive pool per event loop; httpx connections cannot be shared across loops.
+# Each loop maps to its client and the async generator that closes it (see below)
+_perplexity_clients = weakref.WeakKeyDictionary()
+
+def _tavily_status_code(error):
+    """ The Tavily client raises its own error type for 429s """
+    if isinstance(error, UsageLimitExceededError):
+        return 429
+    return http_status_code(error)
+
+def _is_retryable_search_error(error):
+    """ Retry throttling, server errors and network failures, but not bad requests """
+    status = _tavily_status_code(error)
+    if status is not None:
+        return is_overload_status(status)
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError, ConnectionError))
+
+def _hedge_delay_from_env():
+    """ SEARCH_HEDGE_DELAY is a number of seconds, or "auto" to hedge at the observed p95 latency """
+    value = os.environ.get("SEARCH_HEDGE_DELAY")
+    if not value:
+        return None
+    return value if value == "auto" else float(value)
+
+def _search_controls_from_env(name, rps, burst, max_in_flight, **kwargs):
+    """ Build the request controls for a provider, letting <NAME>_RPS, <NAME>_BURST and <NAME>_MAX_IN_FLIGHT override the defaults """
+    prefix = name.upper()
+    governor = ProviderGovernor(
+        name,
+        rps=float(os.environ.get(f"{prefix}_RPS", rps)),
+        burst=int(os.environ.get(f"{prefix}_BURST", burst)),
+        max_in_flight=int(os.environ.get(f"{prefix}_MAX_IN_FLIGHT", max_in_flight)),
+        **kwargs
+    )
+    policy = RequestPolicy(
+        attempts=int(os.environ.get("SEARCH_RETRY_ATTEMPTS", 3)),
+        base_delay=float(os.environ.get("SEARCH_RETRY_BASE_DELAY", 0.5)),
+        max_delay=float(os.environ.get("SEARCH_RETRY_MAX_DELAY", 8.0)),
+        hedge_delay=_hedge_delay_from_env(),
+        retryable=_is_retryable_search_error
+    )
+    return SearchControls(name, governor, policy)
+
+# Process-wide request controls shared by every node and parallel branch
+tavily_controls = _search_controls_from_env("tavily", rps=5, burst=10, max_in_flight=10, status_code=_tavily_status_code)
+perplexity_controls = _search_controls_from_env("perplexity", rps=1, burst=5, max_in_flight=5)
+
+@dataclass
+class QueryClusterStats(MetricCounters):
+    """ Counters for the pre-search query deduplication """
+    queries: int = 0 # Queries generated for search
+    searched: int = 0 # Representatives actually searched
+    collapsed: int = 0 # Near-duplicate queries folded into a representative
+
+query_cluster_stats = QueryClusterStats()
+
+def collapse_queries(queries, threshold):
+    """Keep one representative query per cluster of near-duplicates.
+
+    Queries that differ only in case, word order, filler words or word endings are
+    clustered by TF-IDF cosine similarity (see `cluster_queries`) and only the first
+    query of each cluster is returned, in the original order. The run totals are
+    reported through the run logger.
+    """
+    if not threshold or len(queries) < 2:
+        return list(queries)
+    clusters = cluster_queries(queries, float(threshold))
+    representatives = [queries[cluster[0]] for cluster in clusters]
+
+    query_cluster_stats.queries += len(queries)
+    query_cluster_stats.searched += len(representatives)
+    query_cluster_stats.collapsed += len(queries) - len(representatives)
+    logger = NewsletterLogger.get_current_logger()
+    if logger:
+        logger.log_metrics("query_clusters", query_cluster_stats.as_dict())
+    return representatives
+
+def reset_search_metrics():
+    """ Reset the search counters at the start of a run """
+    tavily_controls.reset()
+    perplexity_controls.reset()
+    query_cluster_stats.reset()
+    cache = get_search_cache()
+    if cache is not None:
+        cache.stats.reset()
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        llm_cache.reset_stats()
+    get_prompt_cache_handler().stats.reset()
+
+# Query parameters that only track the visit and never change the page content
+TRACKING_QUERY_PARAMS = {
+    "gclid", "gbraid", "wbraid", "dclid", "fbclid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "ref_src", "cmpid"
+}
+
+@functools.lru_cache(maxsize=4096)
+def canonicalize_url(url):
+    """Normalize a URL so variants of the same page compare equal.
+
+    http/https and a leading "www." are unified, default ports, fragments, trailing
+    slashes and tracking parameters (utm_* and click ids) are removed, and the
+    remaining query parameters are sorted. Only use the result as a key; cite the
+    original URL.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.hostname:
+        return url
+
+    scheme = parts.scheme.lower()
+    if scheme == "http":
+        scheme = "https"
+    host = parts.hostname
+    if host.startswith("www."):
+        host = host[4:]
+    if port is not None and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_QUERY_PARAMS
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+RAW_CONTENT_OVERHEAD_TOKENS = 20 # Label and truncation marker around the raw content of a source
+
+class _FormattedSource:
+    """ A deduplicated source with its formatted chunk """
+    __slots__ = ("first", "last", "source", "queries", "chunk", "tokens")
+
+    def __init__(self, position, source, query):
+        self.first = position
+        self.last = position
+        self.source = source
+        self.queries = [query]
+        self.chunk = ""
+        self.tokens = 0
+
+class SourceFormatter:
+    """Incrementally deduplicates and formats search responses into a source string.
+
+    Responses can be added in any order, each with its index in the original batch, so
+    results can be formatted as soon as their search returns. The rendered string is the
+    same as formatting the whole batch at once: sources are deduplicated by canonical
+    URL (see `canonicalize_url`), appear in order of first occurrence, and the last
+    occurrence of a URL wins. The URL shown for citation is the original one.
+
+    `extraction` controls which part of the raw content is kept: "head" keeps the
+    beginning of the page, "bm25" keeps the passages that best match the queries that
+    returned the source (see `select_passages`).
+
+    When a `token_budget` is given, it caps the size of the rendered string: the budget
+    is split across sources by relevance score (see `allocate_token_budget`), so short
+    sources keep all of their content and the rest is shared among the longer ones,
+    never more than `max_tokens_per_source` each. If even the headers of all sources do
+    not fit, the lowest-scored sources are left out. `full` turns True once the sources
+    added so far could fill the budget, letting callers stop waiting for the remaining
+    searches.
+
+    When a `near_duplicate_threshold` is given, sources whose text is a near-duplicate
+    (estimated Jaccard similarity of word shingles at or above the threshold) of a
+    higher-scoring source are dropped when rendering, e.g. syndicated copies or
+    AMP/print variants of the same article.
+    """
+
+    def __init__(self, max_tokens_per_source, include_raw_content=True, token_budget=None, near_duplicate_threshold=None, extraction="head"):
+        if extraction not in ("head", "bm25"):
+            raise ValueError(f"Unsupported source extraction: {extraction}")
+        self.max_tokens_per_source = max_tokens_per_source
+        self.include_raw_content = include_raw_content
+        # Values from the environment are strings; a 0 threshold disables the check like None
+        self.token_budget = int(token_budget) if token_budget is not None else None
+        self.near_duplicate_threshold = float(near_duplicate_threshold) if near_duplicate_threshold else None
+        self.extraction = extraction
+        self.tokens = 0
+        # canonical url -> _FormattedSource
+        self._sources = {}
+
+    @property
+    def full(self):
+        return self.token_budget is not None and self.tokens >= self.token_budget
+
+    def add(self, index, response):
+        """ Add the response to the query at position `index` of the batch """
+        response = SearchResponse.coerce(response)
+        for position, source in enumerate(response.results):
+            position = (index, position)
+            url = canonicalize_url(source.url)
+            entry = self._sources.get(url)
+            if entry is None:
+                entry = self._sources[url] = _FormattedSource(position, source, response.query)
+                self._update_chunk(entry)
+                continue
+            entry.first = min(entry.first, position)
+            new_query = response.query not in entry.queries
+            if new_query:
+                entry.queries.append(response.query)
+            if position > entry.last:
+                entry.last = position
+                entry.source = source
+                self._update_chunk(entry)
+            elif new_query and self.extraction == "bm25":
+                self._update_chunk(entry)
+
+    def _update_chunk(self, entry):
+        entry.chunk = self._format_source(entry.source, entry.queries)
+        # Only the budget needs the running token count
+        if self.token_budget is not None:
+            self.tokens -= entry.tokens
+            entry.tokens = count_tokens(entry.chunk)
+            self.tokens += entry.tokens
+
+    def _format_source(self, source, queries, max_tokens=None):
+        """ Format one source, keeping at most `max_tokens` (default `max_tokens_per_source`) of its raw content """
+        if max_tokens is None:
+            max_tokens = self.max_tokens_per_source
+        parts = [
+            f"Source {source.title}:\n===\n",
+            f"URL: {source.url}\n===\n",
+            f"Most relevant content from source: {source.content}\n===\n"
+        ]
+        if self.include_raw_content and max_tokens > 0:
+            # Handle None raw_content
+            raw_content = source.raw_content
+            if raw_content is None:
+                raw_content = ''
+                print(f"Warning: No raw_content found for source {source.url}")
+            if self.extraction == "bm25":
+                raw_content, truncated = select_passages(raw_content, queries, max_tokens)
+            else:
+                raw_content, truncated = truncate_to_tokens(raw_content, max_tokens)
+            if truncated:
+                raw_content += "... [truncated]"
+            parts.append(f"Full source content limited to {max_tokens} tokens: {raw_content}\n\n")
+        return "".join(parts)
+
+    def _raw_content_demand(self, source):
+        """ Tokens of raw content a source would use under `max_tokens_per_source` """
+        if not self.include_raw_content or not source.raw_content:
+            return 0
+        _, truncated = truncate_to_tokens(source.raw_content, self.max_tokens_per_source)
+        return self.max_tokens_per_source if truncated else count_tokens(source.raw_content)
+
+    def _fit_to_budget(self, entries):
+        """ Format the entries with per-source limits allocated from `token_budget` """
+        headers = [count_tokens(self._format_source(entry.source, entry.queries, max_tokens=0)) for entry in entries]
+        if self.include_raw_content:
+            headers = [tokens + RAW_CONTENT_OVERHEAD_TOKENS for tokens in headers]
+
+        # Keep the most relevant sources whose headers fit, always at least one
+        kept = []
+        used = 0
+        for i in sorted(range(len(entries)), key=lambda i: entries[i].source.score or 0.0, reverse=True):
+            if kept and used + headers[i] > self.token_budget:
+                continue
+            kept.append(i)
+            used += headers[i]
+        kept.sort()
+
+        allocation = allocate_token_budget(
+            [self._raw_content_demand(entries[i].source) for i in kept],
+            [entries[i].source.score for i in kept],
+            self.token_budget - used
+        )
+        chunks = [
+            self._format_source(entries[i].source, entries[i].queries, max_tokens=max_tokens)
+            for i, max_tokens in zip(kept, allocation)
+        ]
+
+        logger = NewsletterLogger.get_current_logger()
+        if logger:
+            logger.log_metrics("source_budget", {
+                "budget": self.token_budget,
+                "sources": len(entries),
+                "dropped": len(entries) - len(kept),
+                "allocated": sum(allocation)
+            })
+        return chunks
+
+    def _rendered_text(self, source):
+        """ The text of a source that ends up in the prompt: its raw content when included, else the snippet """
+        if self.include_raw_content:
+            return source.raw_content or source.content
+        return source.content
+
+    def _drop_near_duplicates(self, entries):
+        """ Keep the highest-scoring source of each group of near-duplicate texts """
+        duplicates = set(find_near_duplicates(
+            [self._rendered_text(entry.source) for entry in entries],
+            [entry.source.score for entry in entries],
+            self.near_duplicate_threshold
+        ))
+        if not duplicates:
+            return entries
+
+        logger = NewsletterLogger.get_current_logger()
+        if logger:
+            logger.log_metrics("source_near_duplicates", {
+                "sources": len(entries),
+                "removed": len(duplicates),
+                "tokens_saved": sum(entries[i].tokens or count_tokens(entries[i].chunk) for i in duplicates)
+            })
+        return [entry for i, entry in enumerate(entries) if i not in duplicates]
+
+    def render(self):
+        """ Return the formatted string for the sources added so far """
+        entries = sorted(self._sources.values(), key=lambda entry: entry.first)
+        if self.near_duplicate_threshold is not None:
+            entries = self._drop_near_duplicates(entries)
+        if self.token_budget is not None and entries:
+            chunks = self._fit_to_budget(entries)
+        else:
+            chunks = [entry.chunk for entry in entries]
+        return ("Sources:\n\n" + "".join(chunks)).strip()
+
+def deduplicate_and_format_sources(search_response, max_tokens_per_source, include_raw_content=True, near_duplicate_threshold=None, extraction="head", token_budget=None):
     """
     Takes a list of search responses and formats them into a readable string.
-    Limits the raw_content to approximately max_tokens_per_source.
+    Limits the raw_content to max_tokens_per_source tokens, cut at a sentence end where possible.
+    Optionally drops sources whose text nearly duplicates a higher-scoring source, and
+    fits the whole string into a total token budget split across sources by relevance.
  
     Args:
-        search_responses: List of search response dicts, each containing:
+        search_responses: List of SearchResponse objects (or search response dicts in the
+            Tavily format), each containing:
             - query: str
-            - results: List of dicts with fields:
+            - results: List of SearchResult with fields:
                 - title: str
                 - url: str
                 - content: str
@@ -26,43 +369,22 @@ def deduplicate_and_format_sources(search_response, max_tokens_per_source, inclu
                 - raw_content: str|None
         max_tokens_per_source: int
         include_raw_content: bool
+        near_duplicate_threshold: float|None, similarity (0-1) above which a source is dropped (None or 0 keeps every source)
+        extraction: str, "head" to keep the start of the raw content or "bm25" to keep the passages matching the queries
+        token_budget: int|None, total tokens for all sources
             
     Returns:
         str: Formatted string with deduplicated sources
     """
-     # Collect all results
-    sources_list = []
-    for response in search_response:
-        sources_list.extend(response['results'])
-    
-    # Deduplicate by URL
-    unique_sources = {source['url']: source for source in sources_list}
-
-    # Format output
-    formatted_text = "Sources:\n\n"
-    for i, source in enumerate(unique_sources.values(), 1):
-        formatted_text += f"Source {source['title']}:\n===\n"
-        formatted_text += f"URL: {source['url']}\n===\n"
-        formatted_text += f"Most relevant content from source: {source['content']}\n===\n"
-        if include_raw_content:
-            # Using rough estimate of 4 characters per token
-            char_limit = max_tokens_per_source * 4
-            # Handle None raw_content
-            raw_content = source.get('raw_content', '')
-            if raw_content is None:
-                raw_content = ''
-                print(f"Warning: No raw_content found for source {source['url']}")
-            if len(raw_content) > char_limit:
-                raw_content = raw_content[:char_limit] + "... [truncated]"
-            formatted_text += f"Full source content limited to {max_tokens_per_source} tokens: {raw_content}\n\n"
-                
-    return formatted_text.strip()
+    formatter = SourceFormatter(max_tokens_per_source, include_raw_content=include_raw_content, near_duplicate_threshold=near_duplicate_threshold, extraction=extraction, token_budget=token_budget)
+    for index, response in enumerate(search_response):
+        formatter.add(index, response)
+    return formatter.render()
 
 def format_sections(sections: list[Section]) -> str:
     """ Format a list of sections into a string """
-    formatted_str = ""
-    for idx, section in enumerate(sections, 1):
-        formatted_str += f"""
+    return "".join(
+        f"""
 {'='*60}
 Section {idx}: {section.name}
 {'='*60}
@@ -75,15 +397,69 @@ Content:
 {section.content if section.content else '[Not yet written]'}
 
 """
-    return formatted_str
+        for idx, section in enumerate(sections, 1)
+    )
+
+def _format_completed_item(item) -> str:
+    """ Format one completed execution item with the fields of its type """
+    item_info = [
+        f"ID: {item.id}",
+        f"Type: {type(item).__name__}",
+        f"Block Type: {item.block_type.value}",
+        f"Description: {item.description}",
+        f"Status: {item.status.value}"
+    ]
+
+    # Add type-specific fields
+    if isinstance(item, ResearchBlock):
+        item_info.extend([
+            f"Research Goal: {item.research_goal}",
+            f"Desired Output: {item.desired_output}",
+            f"Relevant Context: {item.relevant_context}",
+            f"Evaluation Criteria: {item.evaluation_criteria if item.evaluation_criteria else 'None'}"
+        ])
+    elif isinstance(item, ReconsiderationBlock):
+        item_info.extend([
+            f"Reason: {item.reason}",
+            f"Guiding Questions: {', '.join(item.guiding_questions) if item.guiding_questions else 'None'}",
+            f"Proposed Changes: {item.proposed_changes if item.proposed_changes else 'None'}"
+        ])
+    elif isinstance(item, TemplateBuilderItem):
+        item_info.extend([
+            f"Template Goal: {item.template_goal}",
+            f"Constraints: {item.constraints if item.constraints else 'None'}",
+            f"Notes: {item.notes if item.notes else 'None'}"
+        ])
+
+    # Add output for all types
+    output = resolve_text(item.output)
+    item_info.append(f"Output: {output if output else 'No output generated'}")
+    return "\n".join(item_info)
+
+def format_completed_items(items) -> str:
+    """ Format completed execution items into a string, separating items clearly """
+    if not items:
+        return "No completed items yet"
+    return "\n\n---\n\n".join(map(_format_completed_item, items))
 
 @traceable
-async def tavily_search_async(search_queries):
+@cache_search_results("tavily", key_params=["max_results", "include_raw_content", "topic"])
+async def tavily_search_async(search_queries, max_results=5, include_raw_content=True, topic="general", max_concurrency=None):
     """
     Performs concurrent web searches using the Tavily API.
 
+    Responses are served from the on-disk search cache when a fresh entry exists, and
+    identical queries already in flight (e.g. from parallel sections) share one request.
+    Requests reaching Tavily go through `tavily_controls`: the rate limiter bounds the
+    request rate and adapts the number in flight to 429/5xx responses, and failures are
+    retried with jittered backoff (optionally hedging slow requests).
+
     Args:
         search_queries (List[SearchQuery]): List of search queries to process
+        max_results (int): Number of results to return per query
+        include_raw_content (bool): Whether to include the full page content
+        topic (str): Tavily search topic ("general" or "news")
+        max_concurrency (int|None): Maximum number of simultaneous requests for this batch
 
     Returns:
             List[dict]: List of search responses from Tavily API, one per query. Each response has format:
@@ -105,25 +481,210 @@ async def tavily_search_async(search_queries):
                 }
     """
     
-    search_tasks = []
-    for query in search_queries:
-            search_tasks.append(
-                tavily_async_client.search(
-                    query,
-                    max_results=5,
-                    include_raw_content=True,
-                    topic="general"
-                )
+    params = {"max_results": max_results, "include_raw_content": include_raw_content, "topic": topic}
+
+    # Values from the environment are strings
+    semaphore = asyncio.Semaphore(max(1, int(max_concurrency or len(search_queries))))
+
+    async def search_one(query):
+        async with semaphore:
+            return await tavily_controls.run(
+                search_cache_key("tavily", query, params),
+                functools.partial(get_tavily_async_client().search, query, **params)
             )
 
+    search_tasks = [search_one(query) for query in search_queries]
+
     # Execute all searches concurrently
     search_docs = await asyncio.gather(*search_tasks)
+    tavily_controls.log_metrics()
+
+    return search_docs
+
+TAVILY_EXTRACT_BATCH_SIZE = 20 # URLs per extract request, the API maximum
+
+def _extracted(page):
+    """ Whether the extraction of a page succeeded; failed ones are not cached, so they are retried """
+    return page.get("raw_content") is not None
+
+@traceable
+@cache_search_results("tavily_extract", key_params=[], normalize=canonicalize_url, cacheable=_extracted)
+async def tavily_extract_async(urls, max_concurrency=None):
+    """Fetches the full page content of URLs using the Tavily extract API.
+
+    Used for the second phase of a two-phase search, once the snippets have been
+    ranked and only the top sources need their full content. URLs are sent in batches
+    of up to TAVILY_EXTRACT_BATCH_SIZE through `tavily_controls`, and the extracted
+    pages are cached on disk like search responses, keyed by canonical URL (see
+    `canonicalize_url`), so variants of a URL share one entry. Pages that could not be
+    extracted are not cached, so a transient failure does not hide the page until the
+    TTL expires.
+
+    Args:
+        urls (List[str]): URLs of the pages to extract
+        max_concurrency (int|None): Maximum number of simultaneous requests
+
+    Returns:
+            List[dict]: One entry per URL, in order:
+                {
+                    'url': str,              # The extracted URL, possibly a variant of the requested one when cached
+                    'raw_content': str|None  # Full page content, None if extraction failed
+                }
+    """
+    batches = [urls[i:i + TAVILY_EXTRACT_BATCH_SIZE] for i in range(0, len(urls), TAVILY_EXTRACT_BATCH_SIZE)]
+    semaphore = asyncio.Semaphore(max(1, int(max_concurrency or len(batches))))
+
+    async def extract_batch(batch):
+        async with semaphore:
+            response = await tavily_controls.run(
+                search_cache_key("tavily_extract", "\n".join(batch), {}, str.strip),
+                functools.partial(get_tavily_async_client().extract, batch)
+            )
+        # Match on the canonical URL in case the API normalized the one we sent
+        contents = {canonicalize_url(result["url"]): result.get("raw_content") for result in response.get("results", [])}
+        return [{"url": url, "raw_content": contents.get(canonicalize_url(url))} for url in batch]
+
+    extracted = await asyncio.gather(*(extract_batch(batch) for batch in batches))
+    tavily_controls.log_metrics()
+
+    return [page for batch in extracted for page in batch]
+
+async def _close_on_shutdown(client: httpx.AsyncClient):
+    """Close `client` when its event loop shuts down.
+
+    Started as an async generator on the loop, it is registered with the loop's async
+    generator hooks; `asyncio.run` (and other runners) finalize these generators with
+    `shutdown_asyncgens` before closing the loop, which closes the client's connections.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+def get_perplexity_client() -> httpx.AsyncClient:
+    """Return the shared Perplexity HTTP client for the running event loop, closed when the loop shuts down."""
+    loop = asyncio.get_running_loop()
+    client, _ = _perplexity_clients.get(loop, (None, None))
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=PERPLEXITY_BASE_URL,
+            headers={
+                "accept": "application/json",
+                "content-type": "application/json",
+                "Authorization": f"Bearer {os.getenv('PERPLEXITY_API_KEY')}"
+            },
+            limits=httpx.Limits(
+                max_connections=PERPLEXITY_MAX_CONNECTIONS,
+                max_keepalive_connections=PERPLEXITY_MAX_CONNECTIONS
+            ),
+            timeout=PERPLEXITY_TIMEOUT
+        )
+        closer = _close_on_shutdown(client)
+        # Run the generator up to its yield, on the loop, so the loop tracks it
+        loop.create_task(closer.__anext__())
+        _perplexity_clients[loop] = (client, closer)
+    return client
+
+def _perplexity_payload(query, model="sonar-pro"):
+    """ Build the chat completion payload for a single Perplexity search """
+    return {
+        "model": model,
+        "messages": [
+            {
+                "role": "system",
+                "content": "Search the web and provide factual information with sources."
+            },
+            {
+                "role": "user",
+                "content": query
+            }
+        ]
+    }
+
+def _format_perplexity_response(query, data):
+    """ Convert a Perplexity chat completion into the Tavily response format """
+    content = data["choices"][0]["message"]["content"]
+    citations = data.get("citations", ["https://perplexity.ai"])
+    
+    # Create results list for this query
+    results = []
+    
+    # First citation gets the full content
+    results.append({
+        "title": f"Perplexity Search, Source 1",
+        "url": citations[0],
+        "content": content,
+        "raw_content": content,
+        "score": 1.0  # Adding score to match Tavily format
+    })
+    
+    # Add additional citations without duplicating content
+    for i, citation in enumerate(citations[1:], start=2):
+        results.append({
+            "title": f"Perplexity Search, Source {i}",
+            "url": citation,
+            "content": "See primary source for full content",
+            "raw_content": None,
+            "score": 0.5  # Lower score for secondary sources
+        })
+    
+    # Format response to match Tavily structure
+    return {
+        "query": query,
+        "follow_up_questions": None,
+        "answer": None,
+        "images": [],
+        "results": results
+    }
+
+@traceable
+@cache_search_results("perplexity", key_params=["model"])
+async def perplexity_search_async(search_queries, max_concurrency=5, model="sonar-pro"):
+    """Performs concurrent web searches using the Perplexity API.
+
+    All queries are sent at once over a shared keep-alive connection pool, with at
+    most `max_concurrency` requests in flight for this batch. Responses are served
+    from the on-disk search cache when a fresh entry exists, and identical queries
+    already in flight (e.g. from parallel sections) share one request. Requests reaching
+    Perplexity go through `perplexity_controls`, the process-wide rate limit and retry
+    policy for the provider.
+
+    Args:
+        search_queries (List[str]): List of search queries to process
+        max_concurrency (int): Maximum number of simultaneous requests
+        model (str): Perplexity model used for the search
+
+    Returns:
+        List[dict]: List of search responses in the same format as `tavily_search_async`,
+            one per query and in the same order as `search_queries`.
+    """
+    client = get_perplexity_client()
+    semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+
+    async def post(query):
+        response = await client.post("/chat/completions", json=_perplexity_payload(query, model))
+        response.raise_for_status()  # Raise exception for bad status codes
+        return _format_perplexity_response(query, response.json())
+
+    async def search_one(query):
+        async with semaphore:
+            return await perplexity_controls.run(
+                search_cache_key("perplexity", query, {"model": model}),
+                functools.partial(post, query)
+            )
+
+    # Execute all searches concurrently
+    search_docs = await asyncio.gather(*[search_one(query) for query in search_queries])
+    perplexity_controls.log_metrics()
 
     return search_docs
 
 @traceable
 def perplexity_search(search_queries):
     """Search the web using the Perplexity API.
+
+    Blocking variant kept for synchronous callers. Graph nodes should use
+    `perplexity_search_async` so they do not stall the event loop.
     
     Args:
         search_queries (List[SearchQuery]): List of search queries to process
@@ -155,63 +716,46 @@ def perplexity_search(search_queries):
     }
     
     search_docs = []
-    for query in search_queries:
-
-        payload = {
-            "model": "sonar-pro",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "Search the web and provide factual information with sources."
-                },
-                {
-                    "role": "user",
-                    "content": query
-                }
-            ]
-        }
-        
-        response = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()  # Raise exception for bad status codes
-        
-        # Parse the response
-        data = response.json()
-        content = data["choices"][0]["message"]["content"]
-        citations = data.get("citations", ["https://perplexity.ai"])
-        
-        # Create results list for this query
-        results = []
-        
-        # First citation gets the full content
-        results.append({
-            "title": f"Perplexity Search, Source 1",
-            "url": citations[0],
-            "content": content,
-            "raw_content": content,
-            "score": 1.0  # Adding score to match Tavily format
-        })
-        
-        # Add additional citations without duplicating content
-        for i, citation in enumerate(citations[1:], start=2):
-            results.append({
-                "title": f"Perplexity Search, Source {i}",
-                "url": citation,
-                "content": "See primary source for full content",
-                "raw_content": None,
-                "score": 0.5  # Lower score for secondary sources
-            })
-        
-        # Format response to match Tavily structure
-        search_docs.append({
-            "query": query,
-            "follow_up_questions": None,
-            "answer": None,
-            "images": [],
-            "results": results
-        })
+    with requests.Session() as session:
+        for query in search_queries:
+            response = session.post(
+                PERPLEXITY_API_URL,
+                headers=headers,
+                json=_perplexity_payload(query)
+            )
+            response.raise_for_status()  # Raise exception for bad status codes
+            search_docs.append(_format_perplexity_response(query, response.json()))
     
     return search_docs
+
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+def _get_sync_loop():
+    """Return the process-wide event loop that `run_sync` runs coroutines on, started on first use."""
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="run-sync-loop", daemon=True).start()
+    return _sync_loop
+
+def run_sync(coro):
+    """Run a coroutine to completion from synchronous code.
+
+    The graph nodes are async; this is the compatibility layer for callers that are
+    not, e.g. `run_sync(graph.ainvoke(inputs, config))`. Every call runs on the same
+    event loop, kept in a background thread: the memoized model and search clients
+    hold connections bound to the loop that opened them, so a fresh loop per call
+    would reuse connections of loops that are already closed. Works from threads with
+    a running loop too, which are blocked until the coroutine is done.
+    """
+    loop = _get_sync_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync cannot be called from a coroutine running on its own loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()